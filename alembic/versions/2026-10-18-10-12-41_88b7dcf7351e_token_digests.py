@@ -0,0 +1,47 @@
+"""store token digests instead of raw tokens
+
+Revision ID: 88b7dcf7351e
+Revises: 06885b6d9b8c
+Create Date: 2026-10-18 10:12:41.406152
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "88b7dcf7351e"
+down_revision = "06885b6d9b8c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("token", sa.Column("access_token_hash", sa.LargeBinary(length=32), nullable=True))
+    op.add_column("token", sa.Column("refresh_token_hash", sa.LargeBinary(length=32), nullable=True))
+    op.execute(
+        "UPDATE token SET "
+        "access_token_hash = sha256(convert_to(access_token, 'UTF8')), "
+        "refresh_token_hash = sha256(convert_to(refresh_token, 'UTF8'))"
+    )
+    op.alter_column("token", "access_token_hash", nullable=False)
+    op.alter_column("token", "refresh_token_hash", nullable=False)
+    op.create_index(op.f("ix_token_access_token_hash"), "token", ["access_token_hash"], unique=True)
+
+    op.drop_index(op.f("ix_token_refresh_token"), table_name="token")
+    op.drop_index(op.f("ix_token_access_token"), table_name="token")
+    op.drop_column("token", "refresh_token")
+    op.drop_column("token", "access_token")
+
+
+def downgrade():
+    # Raw tokens can't be recovered from their digests, so every session is dropped
+    op.execute("DELETE FROM token")
+    op.add_column("token", sa.Column("access_token", sa.String(), nullable=False))
+    op.add_column("token", sa.Column("refresh_token", sa.String(), nullable=False))
+    op.create_index(op.f("ix_token_access_token"), "token", ["access_token"], unique=False)
+    op.create_index(op.f("ix_token_refresh_token"), "token", ["refresh_token"], unique=False)
+
+    op.drop_index(op.f("ix_token_access_token_hash"), table_name="token")
+    op.drop_column("token", "refresh_token_hash")
+    op.drop_column("token", "access_token_hash")
@@ -0,0 +1,31 @@
+"""revoked access tokens
+
+Revision ID: 047e00b068ad
+Revises: 88b7dcf7351e
+Create Date: 2026-10-18 13:40:05.218734
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "047e00b068ad"
+down_revision = "88b7dcf7351e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "revokedtoken",
+        sa.Column("access_token_hash", sa.LargeBinary(length=32), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("access_token_hash"),
+    )
+    op.create_index(op.f("ix_revokedtoken_expires_at"), "revokedtoken", ["expires_at"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_revokedtoken_expires_at"), table_name="revokedtoken")
+    op.drop_table("revokedtoken")
@@ -0,0 +1,66 @@
+"""key sessions by id so a user can have several
+
+Revision ID: 5c1e9a7d3b42
+Revises: 047e00b068ad
+Create Date: 2026-10-18 15:02:17.634051
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c1e9a7d3b42"
+down_revision = "047e00b068ad"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing sessions are kept; their expiry is unknown, so they get the default refresh token lifetime
+    op.add_column(
+        "token",
+        sa.Column(
+            "id", postgresql.UUID(as_uuid=True), server_default=sa.text("gen_random_uuid()"), nullable=False
+        ),
+    )
+    op.add_column(
+        "token",
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("timezone('utc', now())"), nullable=False
+        ),
+    )
+    op.add_column(
+        "token",
+        sa.Column(
+            "expires_at",
+            sa.DateTime(),
+            server_default=sa.text("timezone('utc', now()) + interval '7200 days'"),
+            nullable=False,
+        ),
+    )
+    op.alter_column("token", "id", server_default=None)
+    op.alter_column("token", "created_at", server_default=None)
+    op.alter_column("token", "expires_at", server_default=None)
+
+    op.drop_constraint("token_pkey", "token", type_="primary")
+    op.create_primary_key("token_pkey", "token", ["id"])
+    op.create_index("ix_token_email_created_at", "token", ["email", "created_at"], unique=False)
+    op.create_index(op.f("ix_token_expires_at"), "token", ["expires_at"], unique=False)
+
+
+def downgrade():
+    # Only the newest session of each user fits the one-row-per-user layout
+    op.execute(
+        "DELETE FROM token WHERE id NOT IN "
+        "(SELECT DISTINCT ON (email) id FROM token ORDER BY email, created_at DESC)"
+    )
+    op.drop_index(op.f("ix_token_expires_at"), table_name="token")
+    op.drop_index("ix_token_email_created_at", table_name="token")
+    op.drop_constraint("token_pkey", "token", type_="primary")
+    op.create_primary_key("token_pkey", "token", ["email"])
+
+    op.drop_column("token", "expires_at")
+    op.drop_column("token", "created_at")
+    op.drop_column("token", "id")
@@ -0,0 +1,50 @@
+"""indexes for listing users by creation time
+
+Revision ID: 9b3f6e2c1d70
+Revises: 5c1e9a7d3b42
+Create Date: 2026-10-18 19:05:32.418903
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9b3f6e2c1d70"
+down_revision = "5c1e9a7d3b42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Built concurrently so logins keep writing to the user table meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_created_at_email",
+            "user",
+            ["created_at", "email"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_user_role_created_at_email",
+            "user",
+            ["role", "created_at", "email"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_user_banned_created_at_email",
+            "user",
+            ["created_at", "email"],
+            unique=False,
+            postgresql_where=sa.text("is_banned"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_user_banned_created_at_email", table_name="user", postgresql_concurrently=True)
+        op.drop_index("ix_user_role_created_at_email", table_name="user", postgresql_concurrently=True)
+        op.drop_index("ix_user_created_at_email", table_name="user", postgresql_concurrently=True)
@@ -0,0 +1,45 @@
+"""trigram indexes for searching users by name and email
+
+Revision ID: d41a7c95e8b6
+Revises: 9b3f6e2c1d70
+Create Date: 2026-10-18 20:11:47.903215
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d41a7c95e8b6"
+down_revision = "9b3f6e2c1d70"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm is a trusted extension, the database owner may create it
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_full_name_trgm",
+            "user",
+            ["full_name"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_user_email_trgm",
+            "user",
+            ["email"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    # The extension is left in place, other schemas may use it
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_user_email_trgm", table_name="user", postgresql_concurrently=True)
+        op.drop_index("ix_user_full_name_trgm", table_name="user", postgresql_concurrently=True)
@@ -0,0 +1,135 @@
+"""
+Closed-loop load test of the auth endpoints.
+
+    PYTHONPATH=src python -m benchmarks.load --scenario mixed --concurrency 50 --duration 60 --output mixed.json
+
+Without `--base-url` the app is built in-process from `create_app` (configured by the usual environment
+variables and migrated database), so the numbers exclude the HTTP server but include everything below it.
+"""
+import argparse
+import asyncio
+import datetime
+import platform
+import random
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import httpx
+import orjson
+
+from benchmarks.load.scenarios import API, PASSWORD, SCENARIOS, VirtualUser
+from benchmarks.load.stats import Recorder
+
+# Scenarios whose operations start from an existing session
+_NEEDS_SESSION = {"refresh", "revoke", "profile", "mixed"}
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.load", description="Load test the auth endpoints"
+    )
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument(
+        "--concurrency", type=int, default=20, help="virtual users sending requests in parallel"
+    )
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring starts")
+    parser.add_argument(
+        "--users", type=int, help="accounts shared by the virtual users, defaults to --concurrency"
+    )
+    parser.add_argument("--base-url", help="URL of a running server, the app is run in-process if not set")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="where to write the JSON report, stdout if not set")
+    return parser.parse_args(argv)
+
+
+async def _start_app() -> tuple[Any, Callable[[], httpx.AsyncClient]]:
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+    from app import create_app
+
+    app = create_app()
+    await app.router.startup()
+    return app, lambda: httpx.AsyncClient(app=app, base_url="http://load", timeout=60)
+
+
+async def _create_accounts(make_client: Callable[[], httpx.AsyncClient], emails: list[str]) -> None:
+    # Registration hashes a password, so only as many run at once as there are CPUs to hash with
+    semaphore = asyncio.Semaphore(8)
+
+    async def register(email: str) -> None:
+        async with semaphore, make_client() as client:
+            response = await client.post(
+                f"{API}/", json={"email": email, "full_name": email, "password": PASSWORD}
+            )
+            response.raise_for_status()
+
+    await asyncio.gather(*(register(email) for email in emails))
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    app = None
+    if args.base_url:
+
+        def make_client() -> httpx.AsyncClient:
+            return httpx.AsyncClient(base_url=args.base_url, timeout=60)
+
+    else:
+        app, make_client = await _start_app()
+
+    started_at = datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    run_id = uuid.uuid4().hex[:8]
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    emails = [f"load-{run_id}-{i}@example.com" for i in range(args.users or args.concurrency)]
+    weights = SCENARIOS[args.scenario]
+    users = [
+        VirtualUser(make_client, recorder, emails[i % len(emails)], run_id, random.Random(rng.random()))
+        for i in range(args.concurrency)
+    ]
+
+    try:
+        await _create_accounts(make_client, emails)
+        if args.scenario in _NEEDS_SESSION:
+            await asyncio.gather(*(user.login() for user in users))
+
+        deadline = time.perf_counter() + args.warmup + args.duration
+        load = asyncio.gather(*(user.run(weights, deadline) for user in users))
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        measured_from = time.perf_counter()
+        await load
+        measured = time.perf_counter() - measured_from
+    finally:
+        await asyncio.gather(*(user.close() for user in users))
+        if app is not None:
+            await app.router.shutdown()
+
+    return {
+        "scenario": args.scenario,
+        "weights": weights,
+        "target": args.base_url or "in-process",
+        "concurrency": args.concurrency,
+        "users": len(emails),
+        "warmup_seconds": args.warmup,
+        "duration_seconds": round(measured, 3),
+        "seed": args.seed,
+        "started_at": started_at,
+        "python": platform.python_version(),
+        **recorder.summary(measured),
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    args = parse_args(argv)
+    report = orjson.dumps(asyncio.run(run(args)), option=orjson.OPT_INDENT_2)
+    if args.output:
+        args.output.write_bytes(report + b"\n")
+    else:
+        sys.stdout.buffer.write(report + b"\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import itertools
+import random
+import time
+from typing import Callable, Optional
+
+import httpx
+
+from benchmarks.load.stats import Recorder
+
+API = "/api/v1"
+PASSWORD = "load-test-password"
+
+# Relative weights of the operations each scenario runs; "mixed" approximates production traffic,
+# where most requests only read the profile and sessions are refreshed far more often than created
+SCENARIOS: dict[str, dict[str, int]] = {
+    "login": {"login": 1},
+    "refresh": {"refresh": 1},
+    "revoke": {"revoke": 1},
+    "register": {"register": 1},
+    "profile": {"profile": 1},
+    "mixed": {"profile": 70, "refresh": 15, "login": 8, "register": 3, "revoke": 4},
+}
+
+_registrations = itertools.count()
+
+
+class VirtualUser:
+    """
+    One account driven in a closed loop: it waits for each response before sending the next request.
+    Operations that need a session log in first if the previous one ended it.
+    """
+
+    def __init__(
+        self,
+        make_client: Callable[[], httpx.AsyncClient],
+        recorder: Recorder,
+        email: str,
+        run_id: str,
+        rng: random.Random,
+    ):
+        self.make_client = make_client
+        self.client = make_client()
+        self.recorder = recorder
+        self.email = email
+        self.run_id = run_id
+        self.rng = rng
+        self.logged_in = False
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def _request(
+        self,
+        operation: str,
+        method: str,
+        url: str,
+        client: Optional[httpx.AsyncClient] = None,
+        **kwargs: object,
+    ) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await (client or self.client).request(method, url, **kwargs)  # type: ignore[arg-type]
+        except httpx.HTTPError as e:
+            self.recorder.record(operation, time.perf_counter() - started, type(e).__name__, ok=False)
+            return None
+        self.recorder.record(
+            operation, time.perf_counter() - started, str(response.status_code), ok=response.is_success
+        )
+        return response
+
+    async def register(self) -> None:
+        email = f"load-{self.run_id}-r{next(_registrations)}@example.com"
+        # A fresh client, so the new account's cookies don't replace this user's session
+        async with self.make_client() as client:
+            await self._request(
+                "register",
+                "POST",
+                f"{API}/",
+                client=client,
+                json={"email": email, "full_name": email, "password": PASSWORD},
+            )
+
+    async def login(self) -> None:
+        response = await self._request(
+            "login", "POST", f"{API}/login", data={"username": self.email, "password": PASSWORD}
+        )
+        self.logged_in = response is not None and response.is_success
+
+    async def refresh(self) -> None:
+        if not self.logged_in:
+            await self.login()
+        response = await self._request("refresh", "POST", f"{API}/refresh")
+        self.logged_in = response is not None and response.is_success
+
+    async def revoke(self) -> None:
+        if not self.logged_in:
+            await self.login()
+        await self._request("revoke", "POST", f"{API}/revoke")
+        self.logged_in = False
+
+    async def profile(self) -> None:
+        if not self.logged_in:
+            await self.login()
+        await self._request("profile", "GET", f"{API}/")
+
+    async def run(self, weights: dict[str, int], deadline: float) -> None:
+        operations = [getattr(self, name) for name in weights]
+        while time.perf_counter() < deadline:
+            operation = self.rng.choices(operations, weights=list(weights.values()))[0]
+            await operation()
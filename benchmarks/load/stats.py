@@ -0,0 +1,69 @@
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class OperationStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter[str] = field(default_factory=Counter)
+    errors: int = 0
+
+    def record(self, seconds: float, status: str, ok: bool) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] += 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, duration: float) -> dict[str, Any]:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            "count": count,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "throughput_rps": round(count / duration, 2) if duration else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+                "p50": round(percentile(latencies, 0.50) * 1000, 3),
+                "p95": round(percentile(latencies, 0.95) * 1000, 3),
+                "p99": round(percentile(latencies, 0.99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3) if count else 0.0,
+            },
+        }
+
+
+class Recorder:
+    """
+    Latencies and statuses per operation. Samples are only kept while `recording` is set,
+    so warm-up requests don't skew the results.
+    """
+
+    def __init__(self) -> None:
+        self.recording = False
+        self.operations: dict[str, OperationStats] = {}
+
+    def record(self, operation: str, seconds: float, status: str, ok: bool) -> None:
+        if self.recording:
+            self.operations.setdefault(operation, OperationStats()).record(seconds, status, ok)
+
+    def summary(self, duration: float) -> dict[str, Any]:
+        total = sum(len(stats.latencies) for stats in self.operations.values())
+        errors = sum(stats.errors for stats in self.operations.values())
+        return {
+            "requests": total,
+            "errors": errors,
+            "throughput_rps": round(total / duration, 2) if duration else 0.0,
+            "operations": {name: stats.summary(duration) for name, stats in sorted(self.operations.items())},
+        }
@@ -0,0 +1,145 @@
+"""
+Per-call cost of the code every request runs: JWT encoding and decoding, password verification,
+schema construction and CRUD calls.
+
+    PYTHONPATH=src python -m benchmarks.micro              # compare with benchmarks/micro/baseline.json
+    PYTHONPATH=src python -m benchmarks.micro --save       # record a new baseline
+
+Needs the usual environment variables, since it imports the app's settings; no database is used.
+Exits with status 1 if any case got slower than its baseline by more than `--tolerance`.
+Baselines are only comparable on the machine they were recorded on.
+"""
+import argparse
+import asyncio
+import datetime
+import platform
+import statistics
+import sys
+import time
+import timeit
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "src"))
+
+from benchmarks.micro.cases import CASES, Case, CRUDCases, aiosqlite  # noqa: E402
+
+BASELINE = Path(__file__).with_name("baseline.json")
+# A timed round lasts at least this long when the case doesn't fix its number of calls
+MIN_ROUND_SECONDS = 0.2
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro", description="Run the microbenchmarks")
+    parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="timed rounds per case, the fastest one counts")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 means 25%%")
+    parser.add_argument("--output", type=Path, help="where to write the JSON report, stdout if not set")
+    return parser.parse_args(argv)
+
+
+async def _time_async(case: Case, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        await case.func()  # type: ignore[misc]
+    return time.perf_counter() - started
+
+
+async def _measure(case: Case, repeat: int) -> dict[str, Any]:
+    if case.is_async:
+        number = case.number
+        if number is None:
+            number = 1
+            while await _time_async(case, number) < MIN_ROUND_SECONDS:
+                number *= 2
+        rounds = [await _time_async(case, number) for _ in range(repeat)]
+    else:
+        timer = timeit.Timer(case.func)
+        number = case.number or timer.autorange()[0]
+        rounds = timer.repeat(repeat=repeat, number=number)
+
+    per_call = [elapsed / number for elapsed in rounds]
+    return {
+        "per_call_us": round(min(per_call) * 1e6, 3),
+        "median_us": round(statistics.median(per_call) * 1e6, 3),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for case in CASES:
+        if args.filter in case.name:
+            results[case.name] = await _measure(case, args.repeat)
+
+    crud_cases = CRUDCases() if aiosqlite is not None else None
+    if crud_cases is None:
+        print("aiosqlite isn't installed, skipping the CRUD cases", file=sys.stderr)
+    else:
+        await crud_cases.setup()
+        try:
+            for case in crud_cases.cases():
+                if args.filter in case.name:
+                    results[case.name] = await _measure(case, args.repeat)
+        finally:
+            await crud_cases.teardown()
+
+    return {
+        "created_at": datetime.datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        ratio = result["per_call_us"] / previous["per_call_us"]
+        result["baseline_us"] = previous["per_call_us"]
+        result["ratio"] = round(ratio, 3)
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+
+    regressions: list[str] = []
+    if args.save:
+        if args.baseline.exists() and args.filter:
+            # Keep the cases that weren't run this time
+            stored = orjson.loads(args.baseline.read_bytes())
+            report["results"] = {**stored["results"], **report["results"]}
+        args.baseline.write_bytes(
+            orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS) + b"\n"
+        )
+    elif args.baseline.exists():
+        regressions = compare(report, orjson.loads(args.baseline.read_bytes()), args.tolerance)
+        report["regressions"] = regressions
+
+    output = orjson.dumps(report, option=orjson.OPT_INDENT_2) + b"\n"
+    if args.output:
+        args.output.write_bytes(output)
+    else:
+        sys.stdout.buffer.write(output)
+
+    for name in regressions:
+        result = report["results"][name]
+        print(f"{name}: {result['per_call_us']}us, baseline {result['baseline_us']}us", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+import datetime
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Union
+
+import jwt
+from passlib.hash import bcrypt
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import crud
+from core import security
+from core.auth import authenticate, claims_cache
+from core.config import app_settings
+from db.models.user import User, UserRole
+from schemas.token import Token, TokenCreate
+from schemas.user import UserCreate, UserUpdate
+
+try:
+    from jose import jwt as jose_jwt
+except ImportError:  # pragma: no cover
+    jose_jwt = None
+
+try:
+    import aiosqlite
+except ImportError:  # pragma: no cover
+    aiosqlite = None
+
+
+@dataclass
+class Case:
+    name: str
+    func: Callable[[], Union[Any, Awaitable[Any]]]
+    is_async: bool = False
+    # Calls per timed round; None lets the runner pick enough calls for a measurable round
+    number: Optional[int] = None
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, *, number: Optional[int] = None) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+    def register(func: Callable[[], Any]) -> Callable[[], Any]:
+        CASES.append(Case(name, func, number=number))
+        return func
+
+    return register
+
+
+EMAIL = "bench@example.com"
+CLAIMS = {"user_id": EMAIL, "role": UserRole.USER.value, "sid": str(uuid.uuid4()), "exp": 4102444800}
+ACCESS_TOKEN = security.create_access_token(EMAIL, UserRole.USER, CLAIMS["sid"])
+PYJWT_TOKEN = jwt.encode(CLAIMS, app_settings.SECRET_KEY, algorithm="HS256")
+
+
+@case("jwt.create_access_token")
+def _create_access_token() -> str:
+    return security.create_access_token(EMAIL, UserRole.USER, CLAIMS["sid"])
+
+
+@case("jwt.decode_access_token")
+def _decode_access_token() -> dict[str, Any]:
+    return security.decode_access_token(ACCESS_TOKEN)
+
+
+@case("jwt.authenticate.cached")
+def _authenticate_cached() -> Optional[dict[str, Any]]:
+    return authenticate(ACCESS_TOKEN)
+
+
+@case("jwt.authenticate.uncached")
+def _authenticate_uncached() -> Optional[dict[str, Any]]:
+    claims_cache.clear()
+    return authenticate(ACCESS_TOKEN)
+
+
+@case("jwt.pyjwt.encode")
+def _pyjwt_encode() -> str:
+    return jwt.encode(CLAIMS, app_settings.SECRET_KEY, algorithm="HS256")
+
+
+@case("jwt.pyjwt.decode")
+def _pyjwt_decode() -> dict[str, Any]:
+    return jwt.decode(PYJWT_TOKEN, app_settings.SECRET_KEY, algorithms=["HS256"])
+
+
+if jose_jwt is not None:
+
+    @case("jwt.jose.encode")
+    def _jose_encode() -> str:
+        return jose_jwt.encode(CLAIMS, app_settings.SECRET_KEY, algorithm="HS256")
+
+    @case("jwt.jose.decode")
+    def _jose_decode() -> dict[str, Any]:
+        return jose_jwt.decode(PYJWT_TOKEN, app_settings.SECRET_KEY, algorithms=["HS256"])
+
+
+@case("security.token_digest")
+def _token_digest() -> bytes:
+    return security.token_digest(ACCESS_TOKEN)
+
+
+def _bcrypt_case(rounds: int) -> None:
+    hashed = bcrypt.using(rounds=rounds).hash("bench-password")
+    # Each round doubles the cost, so high costs get few calls per timed round
+    number = max(1, 2 ** (12 - rounds))
+    case(f"password.bcrypt.verify.rounds_{rounds:02d}", number=number)(
+        lambda: bcrypt.verify("bench-password", hashed)
+    )
+
+
+for _rounds in (4, 8, 10, 12):
+    _bcrypt_case(_rounds)
+
+
+@case("schemas.Token")
+def _schema_token() -> Token:
+    return Token(access_token=ACCESS_TOKEN, refresh_token=ACCESS_TOKEN)
+
+
+@case("schemas.TokenCreate")
+def _schema_token_create() -> TokenCreate:
+    return TokenCreate(
+        id=uuid.uuid4(),
+        email=EMAIL,
+        access_token_hash=b"a" * 32,
+        refresh_token_hash=b"r" * 32,
+        expires_at=datetime.datetime(2100, 1, 1),
+    )
+
+
+@case("schemas.UserCreate")
+def _schema_user_create() -> UserCreate:
+    return UserCreate(email=EMAIL, full_name="Bench", password="bench-password")
+
+
+class _UserRow(BaseModel):
+    email: str
+    full_name: str
+    hashed_password: str
+    role: UserRole
+
+
+class CRUDCases:
+    """
+    `crud.user` calls, most of them inherited from `CRUDBase`, against an in-memory SQLite database,
+    so they measure the ORM and driver overhead of each call rather than the network or Postgres.
+    """
+
+    def __init__(self) -> None:
+        self.engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        self.session = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)()
+        self.counter = 0
+
+    async def setup(self) -> None:
+        async with self.engine.begin() as connection:
+            await connection.run_sync(User.__table__.create)
+        self.user = User(email=EMAIL, full_name="Bench", hashed_password="x", role=UserRole.USER)
+        self.session.add(self.user)
+        await self.session.commit()
+
+    async def teardown(self) -> None:
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def get_by_email(self) -> Optional[User]:
+        return await crud.user.get_by_email(self.session, email=EMAIL)
+
+    async def create(self) -> User:
+        self.counter += 1
+        row = _UserRow(
+            email=f"bench{self.counter}@example.com", full_name="Bench", hashed_password="x", role=UserRole.USER
+        )
+        return await crud.user.create(self.session, obj_in=row)  # type: ignore[arg-type]
+
+    async def update(self) -> User:
+        self.counter += 1
+        return await crud.user.update(
+            self.session, db_obj=self.user, obj_in=UserUpdate(full_name=f"Bench {self.counter}")
+        )
+
+    async def get_multi(self) -> list[User]:
+        return await crud.user.get_multi(self.session, limit=100)
+
+    def cases(self) -> list[Case]:
+        return [
+            Case("crud.user.get_by_email", self.get_by_email, is_async=True),
+            Case("crud.user.create", self.create, is_async=True),
+            Case("crud.user.update", self.update, is_async=True),
+            Case("crud.user.get_multi.100", self.get_multi, is_async=True),
+        ]
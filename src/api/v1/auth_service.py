@@ -1,127 +1,174 @@
-from datetime import timedelta
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Collection, Optional
 
+import jwt
 from fastapi import Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.requests import Request
 
 import crud
+import schemas
 from core import security
+from core.auth import authenticate
 from core.config import app_settings
-from db.models import Token, User
-from exceptions import (
-    InvalidLoginData,
-    InvalidRefreshToken,
-    NotFoundException,
-    SomethingWentWrongException,
-    UserIsBanned,
-)
-from schemas.token import TokenCreate, TokenUpdate
+from core.metrics import logins, token_refreshes
+from db.models import User
+from db.models.user import UserRole
+from exceptions import InvalidLoginData, InvalidRefreshToken, UserIsBanned
+from schemas.token import TokenIntrospection
+from token_store import token_store
 
 
 class AuthService:
     async def _login(self, db: AsyncSession, form_data: OAuth2PasswordRequestForm = Depends()) -> User:
         user = await crud.user.authenticate(db, email=form_data.username, password=form_data.password)
         if not user:
+            logins.inc("invalid")
             raise InvalidLoginData()
         elif crud.user.is_banned(user):
+            logins.inc("banned")
             raise UserIsBanned()
 
+        logins.inc("success")
         return user
 
-    async def _create_tokens(self, db: AsyncSession, user: User) -> Token:
+    def _issue_tokens(self, email: str, role: UserRole, session_id: str) -> schemas.Token:
         access_token = security.create_access_token(
-            user,
+            email,
+            role,
+            session_id,
             expires_delta=timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
 
-        refresh_token = security.create_refresh_token(user)
+        refresh_token = security.create_refresh_token(email, session_id)
 
-        existing_token = await crud.token.get_by_email(db, email=user.email)
-        if existing_token:
-            return await self._update_tokens(db, existing_token, user)
+        return schemas.Token(access_token=access_token, refresh_token=refresh_token)
 
-        token_data: Token = await crud.token.create(
+    async def _create_tokens(self, db: AsyncSession, email: str, role: UserRole) -> schemas.Token:
+        session_id = uuid.uuid4()
+        tokens = self._issue_tokens(email, role, str(session_id))
+        evicted = await token_store.save(
             db,
-            obj_in=TokenCreate(email=user.email, access_token=access_token, refresh_token=refresh_token),
+            session_id=session_id,
+            email=email,
+            access_token_hash=security.token_digest(tokens.access_token),
+            refresh_token_hash=security.token_digest(tokens.refresh_token),
         )
+        await self._revoke_access_tokens(db, evicted)
 
-        return token_data
+        return tokens
 
-    async def _update_tokens(self, db: AsyncSession, token: Token, user: User) -> Token:
-        access_token = security.create_access_token(
-            user,
-            expires_delta=timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-        )
-
-        refresh_token = security.create_refresh_token(user)
-
-        token_data: Token = await crud.token.update(
+    async def _revoke_access_tokens(self, db: AsyncSession, access_token_hashes: Collection[bytes]) -> None:
+        # Access tokens stay valid until they expire, so every worker has to reject them until then
+        await crud.revoked_token.revoke_many(
             db,
-            db_obj=token,
-            obj_in=TokenUpdate(email=user.email, access_token=access_token, refresh_token=refresh_token),
+            access_token_hashes=access_token_hashes,
+            expires_at=datetime.utcnow() + timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
 
-        return token_data
-
     async def login_and_create_tokens(
         self, db: AsyncSession, form_data: OAuth2PasswordRequestForm = Depends()
-    ) -> Token:
+    ) -> schemas.Token:
         user = await self._login(db, form_data)
 
-        token_data: Token = await self._create_tokens(db, user)
-
-        return token_data
+        return await self._create_tokens(db, user.email, user.role)
 
-    async def login_after_register(self, db: AsyncSession, user):
-        token_data: Token = await self._create_tokens(db, user)
+    async def login_after_register(self, db: AsyncSession, user: User) -> schemas.Token:
+        return await self._create_tokens(db, user.email, user.role)
 
-        return token_data
+    async def _rotate_tokens(
+        self, db: AsyncSession, access_token: str, refresh_token: str, tokens: schemas.Token
+    ) -> Optional[tuple[str, UserRole]]:
+        return await token_store.rotate(
+            db,
+            access_token_hash=security.token_digest(access_token),
+            refresh_token_hash=security.token_digest(refresh_token),
+            new_access_token_hash=security.token_digest(tokens.access_token),
+            new_refresh_token_hash=security.token_digest(tokens.refresh_token),
+        )
 
-    async def refresh_tokens(self, db: AsyncSession, request: Request) -> Token:
-        access_token: str = str(request.cookies.get("jwt-access"))
-        refresh_token: str = str(request.cookies.get("jwt-refresh"))
+    async def refresh_tokens(self, db: AsyncSession, request: Request) -> schemas.Token:
+        access_token = request.cookies.get("jwt-access")
+        refresh_token = request.cookies.get("jwt-refresh")
 
-        if not access_token and not refresh_token:
+        if not access_token or not refresh_token:
+            token_refreshes.inc("missing")
             raise InvalidRefreshToken()
 
-        token_data = await crud.token.get_by_access_token(db, access_token=access_token)
+        try:
+            claims = security.decode_access_token(access_token, verify_exp=False)
+            role = UserRole(claims["role"])
+            session_id = claims["sid"]
+            expires_at = float(claims["exp"])
+        except (jwt.PyJWTError, KeyError, ValueError) as e:
+            token_refreshes.inc("invalid")
+            raise InvalidRefreshToken() from e
 
-        if not token_data:
-            raise InvalidRefreshToken()
+        tokens = self._issue_tokens(claims["user_id"], role, session_id)
+        rotated = await self._rotate_tokens(db, access_token, refresh_token, tokens)
 
-        if token_data.refresh_token != refresh_token:
+        if not rotated:
+            token_refreshes.inc("rejected")
             raise InvalidRefreshToken()
-
-        user = await crud.user.get_by_email(db, email=token_data.email)
-
-        if not user:
-            raise NotFoundException()
-
-        new_tokens = await self._update_tokens(db, token_data, user)
-
-        return new_tokens
-
-    async def _delete_tokens(self, db: AsyncSession, token: Token) -> str:
-        removed_row = await crud.token.remove_by_email(db, email=token.email)
-        if removed_row:
-            return "Logout Successfully"
-
-        raise SomethingWentWrongException()
+        # The old access token is replaced; once expired it fails the `exp` check anyway
+        if expires_at > time.time():
+            await self._revoke_access_tokens(db, [security.token_digest(access_token)])
+
+        email, current_role = rotated
+        if current_role != role:
+            # The role changed since the old access token was issued, so its claims can't be reused
+            reissued = self._issue_tokens(email, current_role, session_id)
+            if not await self._rotate_tokens(db, tokens.access_token, tokens.refresh_token, reissued):
+                token_refreshes.inc("rejected")
+                raise InvalidRefreshToken()
+            token_refreshes.inc("role_changed")
+            return reissued
+
+        token_refreshes.inc("success")
+        return tokens
 
     async def revoke_tokens(self, db: AsyncSession, request: Request) -> str:
-        access_token: str = str(request.cookies.get("jwt-access"))
-        refresh_token: str = str(request.cookies.get("jwt-refresh"))
-
-        if not access_token and not refresh_token:
-            return "Logout Successfully"
-
-        token_data = await crud.token.get_by_access_token(db, access_token=access_token)
-
-        if not token_data:
-            return "Logout Successfully"
+        access_token = request.cookies.get("jwt-access")
+        refresh_token = request.cookies.get("jwt-refresh")
 
-        if token_data.refresh_token != refresh_token:
+        if not access_token or not refresh_token:
             return "Logout Successfully"
 
-        return await self._delete_tokens(db, token_data)
+        access_token_hash = security.token_digest(access_token)
+        revoked = await token_store.revoke(
+            db,
+            access_token_hash=access_token_hash,
+            refresh_token_hash=security.token_digest(refresh_token),
+        )
+        if revoked:
+            await self._revoke_access_tokens(db, [access_token_hash])
+
+        return "Logout Successfully"
+
+    async def revoke_all_sessions(self, db: AsyncSession, email: str) -> int:
+        revoked = await token_store.revoke_all(db, email=email)
+        await self._revoke_access_tokens(db, revoked)
+        return len(revoked)
+
+    async def introspect_tokens(self, db: AsyncSession, tokens: list[str]) -> list[TokenIntrospection]:
+        claims = {token: authenticate(token) for token in tokens}
+        digests = {
+            token: security.token_digest(token) for token, payload in claims.items() if payload is not None
+        }
+        issued = await token_store.filter_active(db, access_token_hashes=digests.values())
+
+        results = []
+        for token in tokens:
+            payload = claims[token]
+            if payload is None or digests[token] not in issued:
+                results.append(TokenIntrospection(active=False))
+                continue
+            results.append(
+                TokenIntrospection(
+                    active=True, user_id=payload["user_id"], role=payload["role"], exp=payload["exp"]
+                )
+            )
+        return results
@@ -0,0 +1,29 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import schemas
+from api.v1.auth_service import AuthService
+from core import dependencies
+
+router = APIRouter()
+
+
+@router.post(
+    "/introspect",
+    response_model=schemas.IntrospectionResponse,
+    dependencies=[Depends(dependencies.service_client)],
+)
+async def introspect(
+    *,
+    db: AsyncSession = Depends(dependencies.get_session),
+    auth_service: AuthService = Depends(),
+    body: schemas.IntrospectionRequest,
+) -> Any:
+    """
+    Batch check of access tokens for other services: signature, expiry and whether the session is still active.
+    """
+    results = await auth_service.introspect_tokens(db, body.tokens)
+
+    return {"results": results}
@@ -7,11 +7,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 import schemas
 from api.v1.auth_service import AuthService
 from core import dependencies
+from core.decorators import transactional
 
 router = APIRouter()
 
 
 @router.post("/login", response_model=schemas.Token)
+@transactional
 async def login(
     response: Response,
     db: AsyncSession = Depends(dependencies.get_session),
@@ -33,6 +35,7 @@ async def login(
 
 
 @router.post("/refresh", response_model=schemas.Token)
+@transactional
 async def refresh(
     request: Request,
     response: Response,
@@ -54,6 +57,7 @@ async def refresh(
 
 
 @router.post("/revoke")
+@transactional
 async def revoke(
     request: Request,
     response: Response,
@@ -69,3 +73,22 @@ async def revoke(
     response.delete_cookie(key="jwt-refresh", samesite="strict")
 
     return message
+
+
+@router.post("/revoke-all")
+@transactional
+async def revoke_all(
+    response: Response,
+    db: AsyncSession = Depends(dependencies.get_session),
+    current_user: dict[str, Any] = Depends(dependencies.get_current_user_data),
+    auth_service: AuthService = Depends(),
+) -> str:
+    """
+    Log out of every session of the current user
+    """
+    await auth_service.revoke_all_sessions(db, current_user["user_id"])
+
+    response.delete_cookie(key="jwt-access", samesite="strict")
+    response.delete_cookie(key="jwt-refresh", samesite="strict")
+
+    return "Logout Successfully"
@@ -1,19 +1,35 @@
-from typing import Any
+import datetime
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, Response
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import crud
 from api.v1.auth_service import AuthService
 from core import dependencies
+from core.decorators import transactional
+from core.pagination import decode_cursor, encode_cursor
+from core.user_export import MEDIA_TYPES, export_users
+from core.user_import import log_progress, user_importer
+from db.models.user import UserRole
 from exceptions import NoPermissionToDo, NotFoundException, SameEmailError
 from schemas import User, UserCreate
-from schemas.user import UserForceCreate, UserProfile
+from schemas.user import (
+    FileFormat,
+    UserForceCreate,
+    UserImportReport,
+    UserPage,
+    UserProfile,
+    UserSearchResult,
+    UserSummary,
+)
 
 router = APIRouter()
 
 
 @router.post("/", response_model=User)
+@transactional
 async def create_user(
     *,
     response: Response,
@@ -39,6 +55,7 @@ async def create_user(
 
 
 @router.post("/force", response_model=User)
+@transactional
 async def create_user_force(
     *,
     db: AsyncSession = Depends(dependencies.get_session),
@@ -48,7 +65,7 @@ async def create_user_force(
     """
     Force create of a new user.
     """
-    if not user_in.role.is_child_of(admin["role"]):
+    if not user_in.role.is_child_of(UserRole(admin["role"])):
         raise NoPermissionToDo()
 
     user = await crud.user.get_by_email(db, email=user_in.email)
@@ -60,6 +77,99 @@ async def create_user_force(
     return user
 
 
+@router.post("/import", response_model=UserImportReport)
+async def import_users(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(dependencies.get_session),
+    admin: dict[str, Any] = Depends(dependencies.current_admin),
+    file_format: FileFormat = Query(FileFormat.CSV, alias="format"),
+) -> Any:
+    """
+    Bulk create users from a CSV file with a header row, or JSON lines, sent as the request body.
+    Each row has `email`, `full_name`, optionally `role`, and either `password` or a bcrypt `hashed_password`.
+    Rows are committed in batches as the body streams in; existing emails are skipped and reported.
+    """
+    return await user_importer.run(
+        db,
+        request.stream(),
+        file_format,
+        creator_role=UserRole(admin["role"]),
+        on_progress=log_progress,
+    )
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_all_users(
+    *,
+    admin: dict[str, Any] = Depends(dependencies.current_admin),
+    file_format: FileFormat = Query(FileFormat.CSV, alias="format"),
+) -> Any:
+    """
+    Stream every user as CSV or JSON lines, without password hashes.
+    """
+    return StreamingResponse(
+        export_users(file_format),
+        media_type=MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="users.{file_format.value}"'},
+    )
+
+
+@router.get("/users", response_model=UserPage)
+async def list_users(
+    *,
+    db: AsyncSession = Depends(dependencies.get_session),
+    admin: dict[str, Any] = Depends(dependencies.current_admin),
+    role: Optional[UserRole] = None,
+    is_banned: Optional[bool] = None,
+    created_from: Optional[datetime.datetime] = None,
+    created_to: Optional[datetime.datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    with_total: bool = False,
+) -> Any:
+    """
+    List users newest first, a page at a time; pass the `next_cursor` of a page to get the one after it.
+    `with_total` adds an estimate of how many users match the filters.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether there is a next page
+    rows = await crud.user.get_page(
+        db,
+        role=role,
+        is_banned=is_banned,
+        created_from=created_from,
+        created_to=created_to,
+        before=before,
+        limit=limit + 1,
+    )
+
+    page = UserPage(items=[UserSummary.from_orm(row) for row in rows[:limit]])
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        page.next_cursor = encode_cursor(last.created_at, last.email)
+    if with_total:
+        page.approximate_total = await crud.user.estimate_total(
+            db, role=role, is_banned=is_banned, created_from=created_from, created_to=created_to
+        )
+    return page
+
+
+@router.get("/users/search", response_model=list[UserSearchResult])
+async def search_users(
+    *,
+    db: AsyncSession = Depends(dependencies.get_session),
+    admin: dict[str, Any] = Depends(dependencies.current_admin),
+    q: str = Query(..., min_length=3, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+) -> Any:
+    """
+    Find users by part of their name or email, tolerating typos; best matches first.
+    """
+    rows = await crud.user.search(db, term=q, limit=limit)
+    return [UserSearchResult.from_orm(row) for row in rows]
+
+
 @router.get("/", response_model=UserProfile)
 async def get_user(
     *,
@@ -0,0 +1,25 @@
+import hashlib
+
+import orjson
+from fastapi import APIRouter, Request, Response
+
+from core.config import app_settings
+from core.keys import key_ring
+
+router = APIRouter()
+
+_jwks_body = orjson.dumps(key_ring.jwks())
+_jwks_headers = {
+    "Cache-Control": f"public, max-age={app_settings.JWKS_MAX_AGE_SECONDS}",
+    "ETag": f'"{hashlib.sha256(_jwks_body).hexdigest()[:32]}"',
+}
+
+
+@router.get("/.well-known/jwks.json")
+async def jwks(request: Request) -> Response:
+    """
+    Public keys to verify access tokens without calling this service.
+    """
+    if request.headers.get("if-none-match") == _jwks_headers["ETag"]:
+        return Response(status_code=304, headers=_jwks_headers)
+    return Response(content=_jwks_body, media_type="application/json", headers=_jwks_headers)
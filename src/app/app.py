@@ -3,18 +3,28 @@ import traceback
 from fastapi import Depends, FastAPI, Request, Response
 from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import ORJSONResponse
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from loguru import logger
 from starlette.middleware.cors import CORSMiddleware
 
 import crud
+from api import well_known
 from api.v1.api import api_router
+from core import dependencies
+from core.auth import AuthenticationMiddleware
 from core.config import app_settings
-from core.dependencies import get_session
+from core.hashing import password_hasher
+from core.health import health_monitor
+from core.metrics import MetricsMiddleware, api_errors, registry, unhandled_exceptions
+from core.revocation import revocation_listener
+from core.sweeper import session_sweeper
+from core.warmup import warm_up_pool
 from db.models.user import UserRole
-from db.session import async_session
+from db.pool import PoolStats
+from db.session import async_session, pool_stats
 from exceptions import APIException, SomethingWentWrongException
 from schemas.user import UserForceCreate
+from token_store import token_store
 
 
 def create_app() -> FastAPI:
@@ -26,10 +36,33 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(AuthenticationMiddleware)
+    app.add_middleware(MetricsMiddleware, routes=app.routes, debug_headers=app_settings.SQL_DEBUG_HEADERS)
 
     @app.get("/healthcheck")
-    def healthcheck(session: AsyncSession = Depends(get_session)) -> None:
-        pass
+    async def healthcheck() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/healthcheck/live")
+    async def healthcheck_live() -> dict[str, str]:
+        return {"status": "ok"}
+
+    @app.get("/healthcheck/ready")
+    async def healthcheck_ready() -> Response:
+        status = health_monitor.status()
+        return ORJSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    @app.get("/healthcheck/pool")
+    async def healthcheck_pool() -> PoolStats:
+        return pool_stats()
+
+    @app.get("/healthcheck/sweeper")
+    async def healthcheck_sweeper() -> dict[str, object]:
+        return session_sweeper.stats()
+
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(dependencies.metrics_scraper)])
+    async def metrics() -> Response:
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
     @app.exception_handler(RequestValidationError)
     async def validation_exception_handler(request: Request, exc: RequestValidationError) -> Response:
@@ -38,6 +71,7 @@ def create_app() -> FastAPI:
 
     @app.exception_handler(APIException)
     async def api_exception_handler(request: Request, exception: APIException) -> Response:
+        api_errors.inc(exception.default_code)
         return ORJSONResponse(
             content=APIException.Schema(
                 code=exception.default_code,
@@ -49,6 +83,7 @@ def create_app() -> FastAPI:
     @app.exception_handler(Exception)
     async def exception_handler(request: Request, exception: Exception) -> Response:
         if not isinstance(exception, APIException):
+            unhandled_exceptions.inc(type(exception).__name__)
             exception = SomethingWentWrongException()
         return ORJSONResponse(
             content=APIException.Schema(
@@ -60,22 +95,43 @@ def create_app() -> FastAPI:
 
     @app.on_event("startup")
     async def startup():
+        await password_hasher.start()
+
         async with async_session() as db:
-            user = await crud.user.get_admin(db)
-
-        if user:
-            return
-
-        _ = await crud.user.create_user(
-            db,
-            obj_in=UserForceCreate(
-                role=UserRole.SUPERUSER,
-                email=app_settings.SUPERUSER_EMAIL,
-                password=app_settings.SUPERUSER_PASS,
-                full_name=app_settings.SUPERUSER_EMAIL,
-            ),
-        )
+            created = await crud.user.create_superuser_once(
+                db,
+                obj_in=UserForceCreate(
+                    role=UserRole.SUPERUSER,
+                    email=app_settings.SUPERUSER_EMAIL,
+                    password=app_settings.SUPERUSER_PASS,
+                    full_name=app_settings.SUPERUSER_EMAIL,
+                ),
+            )
+            await db.commit()
+            admin = None if created else await crud.user.get_admin(db)
+        if created:
+            logger.info("Created the superuser {}", app_settings.SUPERUSER_EMAIL)
+        elif admin is None:
+            logger.error(
+                "There is no superuser: SUPERUSER_EMAIL {} belongs to a user who isn't one",
+                app_settings.SUPERUSER_EMAIL,
+            )
+
+        if app_settings.DB_POOL_WARM_UP:
+            await warm_up_pool(app_settings.DB_POOL_SIZE)
+        await revocation_listener.start()
+        session_sweeper.start()
+        health_monitor.start()
+
+    @app.on_event("shutdown")
+    async def shutdown() -> None:
+        password_hasher.shutdown()
+        await revocation_listener.stop()
+        await session_sweeper.stop()
+        await health_monitor.stop()
+        await token_store.close()
 
     app.include_router(api_router, prefix=app_settings.API_V1_STR)
+    app.include_router(well_known.router, tags=["Keys"])
 
     return app
@@ -0,0 +1,84 @@
+"""
+Bulk import of users from a CSV file with a header row, or JSON lines, straight into the database.
+
+    PYTHONPATH=src python -m cli.import_users users.csv
+    PYTHONPATH=src python -m cli.import_users - --format jsonl < users.jsonl
+
+Each row has `email`, `full_name`, optionally `role` (U, A or SU), and either `password` or a bcrypt
+`hashed_password`. Passwords are hashed on every CPU of this host, so there is no need to stop the service,
+and users that already exist are skipped, so an interrupted import can simply be run again.
+Progress goes to stderr and the report to stdout; the exit status is 1 if any row was not imported.
+"""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+
+from core.config import app_settings
+from core.hashing import password_hasher
+from core.user_import import UserImporter
+from db.session import async_session, engine_async
+from schemas.user import FileFormat, UserImportReport
+
+CHUNK_SIZE = 1 << 20
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m cli.import_users", description="Bulk import users")
+    parser.add_argument("path", help="file to import, - for stdin")
+    parser.add_argument(
+        "--format",
+        choices=[file_format.value for file_format in FileFormat],
+        help="defaults to jsonl for .jsonl and .ndjson files and csv otherwise",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=app_settings.USER_IMPORT_BATCH_SIZE, help="rows per transaction"
+    )
+    parser.add_argument(
+        "--max-errors",
+        type=int,
+        default=app_settings.USER_IMPORT_MAX_ERRORS,
+        help="row errors listed in the report",
+    )
+    return parser.parse_args(argv)
+
+
+async def _read_chunks(file: BinaryIO) -> AsyncIterator[bytes]:
+    while chunk := await asyncio.to_thread(file.read, CHUNK_SIZE):
+        yield chunk
+
+
+def _print_progress(report: UserImportReport) -> None:
+    print(
+        f"{report.rows} rows read, {report.imported} imported, {report.duplicates} duplicates, "
+        f"{report.failed} failed, {report.imported / report.seconds:.0f} users/s",
+        file=sys.stderr,
+    )
+
+
+async def run(args: argparse.Namespace) -> UserImportReport:
+    file_format = FileFormat(args.format) if args.format else None
+    if file_format is None:
+        is_jsonl = Path(args.path).suffix in (".jsonl", ".ndjson")
+        file_format = FileFormat.JSONL if is_jsonl else FileFormat.CSV
+
+    importer = UserImporter(batch_size=args.batch_size, max_errors=args.max_errors)
+    await password_hasher.start()
+    try:
+        with sys.stdin.buffer if args.path == "-" else open(args.path, "rb") as file:
+            async with async_session() as db:
+                return await importer.run(db, _read_chunks(file), file_format, on_progress=_print_progress)
+    finally:
+        password_hasher.shutdown()
+        await engine_async.dispose()
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    report = asyncio.run(run(parse_args(argv)))
+    print(report.json(indent=2))
+    sys.exit(1 if report.failed or report.duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
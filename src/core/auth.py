@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import jwt
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from core.config import app_settings
+from core.metrics import registry
+from core.revocation import revocation_list
+from core.security import decode_access_token, token_digest
+
+ACCESS_COOKIE = "jwt-access"
+
+
+class ClaimsCache:
+    """
+    Bounded LRU of already verified access-token claims keyed by the token digest.
+    Entries are dropped once the token's `exp` has passed, so a hit never outlives the token.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, claims = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return claims
+
+    def put(self, key: bytes, claims: dict[str, Any]) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (float(claims.get("exp", 0)), claims)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+claims_cache = ClaimsCache(app_settings.ACCESS_TOKEN_CACHE_SIZE)
+registry.callback("access_token_cache_entries", "Verified access tokens cached", lambda: len(claims_cache))
+
+
+def authenticate(raw_jwt: Optional[str]) -> Optional[dict[str, Any]]:
+    if not raw_jwt:
+        return None
+
+    key = token_digest(raw_jwt)
+    if key in revocation_list:
+        return None
+
+    claims = claims_cache.get(key)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = decode_access_token(raw_jwt)
+    except jwt.PyJWTError:
+        return None
+
+    claims_cache.put(key, claims)
+    return claims
+
+
+class AuthenticationMiddleware:
+    """
+    Verifies the `jwt-access` cookie once per request and stores the claims,
+    or None for anonymous requests, in `scope["auth"]`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket"):
+            scope["auth"] = authenticate(HTTPConnection(scope).cookies.get(ACCESS_COOKIE))
+        await self.app(scope, receive, send)
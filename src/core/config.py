@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseSettings, PostgresDsn, validator
 
@@ -13,6 +13,11 @@ class AppSettings(BaseSettings):
 
     API_V1_STR: str = "/api/v1"
     SECRET_KEY: str
+    JWT_PRIVATE_KEY_FILES: List[str] = []
+    # Keep accepting HS256 tokens without a `kid` once JWT_PRIVATE_KEY_FILES sign new ones; only for the
+    # migration window, anyone holding SECRET_KEY can forge tokens while it's on
+    JWT_ACCEPT_HMAC: bool = False
+    JWKS_MAX_AGE_SECONDS: int = 3600
 
     POSTGRES_HOST: str
     POSTGRES_USER: str
@@ -20,12 +25,68 @@ class AppSettings(BaseSettings):
     POSTGRES_DB: str
     SQLALCHEMY_DATABASE_URI_ASYNC: Optional[AsyncPostgresDsn] = None
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = -1
+    # Costs a round trip per checkout; with it off, rely on DB_POOL_RECYCLE_SECONDS to drop stale connections
+    DB_POOL_PRE_PING: bool = True
+    # Set both to 0 behind a transaction-pooling pgbouncer
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # Open the pool's connections and prepare the login and refresh statements on them before serving
+    DB_POOL_WARM_UP: bool = True
+    # Statements slower than this are logged with the request they ran in; unset or 0 disables it
+    SQL_SLOW_QUERY_MS: Optional[float] = 200.0
+    # Warns about identical statements a request ran more than once; for debugging, not production
+    SQL_WARN_REPEATED_STATEMENTS: bool = False
+    # Adds X-DB-Query-Count and X-DB-Query-Time-Ms to every response; for debugging, not production
+    SQL_DEBUG_HEADERS: bool = False
+
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 3600
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7200
+    ACCESS_TOKEN_CACHE_SIZE: int = 10000
+    REVOCATION_RECONNECT_SECONDS: float = 1.0
+    REVOCATION_PRUNE_SECONDS: float = 60.0
+
+    # "memory" keeps sessions in the worker process and only suits a single worker
+    TOKEN_STORE_BACKEND: Literal["postgres", "redis", "memory"] = "postgres"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    REDIS_KEY_PREFIX: str = "auth:"
+    # Logging in beyond this many sessions ends the user's oldest one; 0 means no limit
+    MAX_SESSIONS_PER_USER: int = 10
+    # Expired sessions and revocations are deleted in the background; an interval of 0 disables it
+    SESSION_SWEEP_INTERVAL_SECONDS: float = 300.0
+    SESSION_SWEEP_BATCH_SIZE: int = 1000
+    SESSION_SWEEP_JITTER: float = 0.2
+
+    # Readiness probes read the result of a database ping run this often in the background
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 2.0
+    # Share of pooled connections, overflow included, in use at which a worker stops reporting ready
+    HEALTH_MAX_POOL_USAGE: float = 1.0
+
+    INTROSPECTION_MAX_TOKENS: int = 500
+    # Services send it in the X-Service-Key header; introspection is refused to everyone while it's unset
+    INTROSPECTION_API_KEY: Optional[str] = None
+    # Scrapers send it as a bearer token; /metrics is refused to everyone while it's unset
+    METRICS_API_KEY: Optional[str] = None
 
     SUPERUSER_EMAIL: str
     SUPERUSER_PASS: str
 
+    PASSWORD_HASH_SCHEMES: List[str] = ["bcrypt"]
+    PASSWORD_HASH_TARGET_MS: Optional[float] = None
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 5.0
+
+    # Rows hashed and written per transaction of a bulk user import
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    USER_IMPORT_MAX_ERRORS: int = 1000
+    # Users read per query while streaming an export
+    USER_EXPORT_PAGE_SIZE: int = 1000
+
     @validator("POSTGRES_DB", pre=True)
     def assemble_db_name(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
         if values.get("TEST_MODE"):
@@ -33,6 +94,15 @@ class AppSettings(BaseSettings):
         if isinstance(v, str):
             return v
 
+    @validator("PASSWORD_HASH_SCHEMES")
+    def check_password_hash_schemes(cls, v: List[str]) -> List[str]:
+        if not v:
+            raise ValueError("At least one password hash scheme is required")
+        unsupported = set(v) - {"bcrypt", "argon2"}
+        if unsupported:
+            raise ValueError(f"Unsupported password hash schemes: {', '.join(sorted(unsupported))}")
+        return v
+
     @validator("SQLALCHEMY_DATABASE_URI_ASYNC", pre=True)
     def assemble_async_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
         if isinstance(v, str):
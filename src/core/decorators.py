@@ -1,10 +1,16 @@
 import functools
 import inspect
 
-from exceptions import SomethingWentWrongException
+from core.metrics import unhandled_exceptions
+from exceptions import APIException, SomethingWentWrongException
 
 
 def transactional(func):
+    """
+    Unit of work for an endpoint: CRUD calls only flush, and the endpoint's `db` session
+    is committed once after it returns, before the response is rendered.
+    """
+
     @functools.wraps(func)
     async def wrap_func(*args, **kwargs):
         try:
@@ -13,9 +19,13 @@ def transactional(func):
             else:
                 result = func(*args, **kwargs)
             await kwargs["db"].commit()
-        except Exception:
+        except APIException:
+            await kwargs["db"].rollback()
+            raise
+        except Exception as e:
             await kwargs["db"].rollback()
-            raise SomethingWentWrongException()
+            unhandled_exceptions.inc(type(e).__name__)
+            raise SomethingWentWrongException() from e
 
         return result
 
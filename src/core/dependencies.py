@@ -1,11 +1,12 @@
-from typing import Any, AsyncGenerator
+import hmac
+from typing import Any, AsyncGenerator, Optional
 
-import jwt
-from fastapi import HTTPException
+from fastapi import Depends, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.requests import Request
 
+from core.auth import ACCESS_COOKIE, authenticate
 from core.config import app_settings
 from db.models.user import UserRole
 from db.session import async_session
@@ -17,26 +18,39 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-def get_current_user_data(request: Request) -> dict[str, Any]:
-    unauthorized_exc = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    raw_jwt = request.cookies.get("jwt-access")
+async def get_current_user_data(request: Request) -> dict[str, Any]:
+    payload: Optional[dict[str, Any]]
+    if "auth" in request.scope:
+        payload = request.scope["auth"]
+    else:
+        payload = authenticate(request.cookies.get(ACCESS_COOKIE))
 
-    if raw_jwt is None:
-        raise unauthorized_exc
-    try:
-        payload = jwt.decode(
-            raw_jwt,
-            app_settings.SECRET_KEY,
-            algorithms=["HS256"],
-        )
-    except jwt.PyJWTError as e:
-        raise unauthorized_exc from e
+    if payload is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
 
     return payload
 
 
-def current_admin(request: Request) -> dict[str, Any]:
-    payload = get_current_user_data(request)
-    if payload["role"] is [UserRole.USER]:
+async def current_admin(payload: dict[str, Any] = Depends(get_current_user_data)) -> dict[str, Any]:
+    if payload["role"] == UserRole.USER.value:
         raise KudaPoperError()
     return payload
+
+
+async def service_client(x_service_key: str = Header("")) -> None:
+    expected = app_settings.INTROSPECTION_API_KEY
+    # Without a configured key no caller counts as a service
+    if expected is None or not hmac.compare_digest(x_service_key.encode(), expected.encode()):
+        raise KudaPoperError()
+
+
+async def metrics_scraper(authorization: str = Header("")) -> None:
+    expected = app_settings.METRICS_API_KEY
+    scheme, _, credentials = authorization.partition(" ")
+    # Without a configured key metrics aren't exposed to anyone
+    if (
+        expected is None
+        or scheme.lower() != "bearer"
+        or not hmac.compare_digest(credentials.encode(), expected.encode())
+    ):
+        raise KudaPoperError()
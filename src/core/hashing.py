@@ -0,0 +1,243 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar, cast
+
+from loguru import logger
+from passlib.context import CryptContext
+from passlib.registry import get_crypt_handler
+
+from core.config import app_settings
+from core.metrics import password_hash_duration, password_hash_rejected, registry
+from exceptions import PasswordHashingUnavailable
+
+T = TypeVar("T")
+
+SUPPORTED_SCHEMES = ("bcrypt", "argon2")
+
+# Lowest cost calibration may pick, whatever the host speed, and the point where it stops searching.
+_MIN_ROUNDS = {"bcrypt": 10, "argon2": 2}
+_MAX_ROUNDS = {"bcrypt": 16, "argon2": 32}
+
+_PROBE_PASSWORD = "calibration-probe"
+
+# Passwords per worker call in batches: enough to save round trips, few enough that a call
+# doesn't hold a worker for long while logins wait behind it.
+_HASH_MANY_CHUNK_SIZE = 4
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def default_policy(schemes: list[str]) -> dict[str, Any]:
+    policy: dict[str, Any] = {"schemes": schemes, "deprecated": "auto"}
+    if "argon2" in schemes:
+        policy["argon2__type"] = "ID"
+    return policy
+
+
+def _measure(handler: Any, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(2):
+        started = time.perf_counter()
+        handler.using(rounds=rounds).hash(_PROBE_PASSWORD)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def calibrate_rounds(scheme: str, target_seconds: float) -> int:
+    handler = get_crypt_handler(scheme)
+    if scheme == "argon2":
+        handler = handler.using(type="ID")
+
+    rounds = _MIN_ROUNDS[scheme]
+    elapsed = _measure(handler, rounds)
+    while rounds < _MAX_ROUNDS[scheme]:
+        # bcrypt rounds are a log2 work factor, argon2 time cost grows linearly
+        if scheme == "bcrypt":
+            estimate = elapsed * 2
+        else:
+            estimate = elapsed * (rounds + 1) / rounds
+        if estimate > target_seconds:
+            break
+        rounds += 1
+        elapsed = estimate
+    return rounds
+
+
+def calibrate_policy(schemes: list[str], target_seconds: float) -> dict[str, Any]:
+    """
+    Picks the cost of the primary scheme so that one hash takes about `target_seconds` on this host.
+    Only `min_rounds` is pinned, so hashes made with a higher cost (e.g. by a faster replica) are
+    not rehashed back down, while weaker ones are upgraded on the next login.
+    """
+    policy = default_policy(schemes)
+    primary = schemes[0]
+    rounds = calibrate_rounds(primary, target_seconds)
+    policy[f"{primary}__rounds"] = rounds
+    policy[f"{primary}__min_rounds"] = rounds
+    return policy
+
+
+def _configure(policy: dict[str, Any]) -> None:
+    pwd_context.load(policy)
+
+
+def _hash(password: str) -> str:
+    return cast(str, pwd_context.hash(password))
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return cast(bool, pwd_context.verify(plain_password, hashed_password))
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return cast(tuple[bool, Optional[str]], pwd_context.verify_and_update(plain_password, hashed_password))
+
+
+def _ping() -> None:
+    return None
+
+
+class PasswordHasher:
+    """
+    Runs password hashing in a pool of worker processes so it never blocks the event loop.
+    **Parameters**
+    * `schemes`: passlib schemes, the first one is used for new hashes and the rest are rehashed on login
+    * `target_ms`: Per-hash latency budget used to calibrate the cost on start, library default if not set
+    * `workers`: Number of worker processes, defaults to the number of CPUs
+    * `queue_size`: How many calls may wait for a free worker before new ones are rejected
+    * `timeout`: Seconds a single call may take, including the time spent waiting in the queue
+    """
+
+    def __init__(
+        self,
+        schemes: list[str],
+        target_ms: Optional[float],
+        workers: Optional[int],
+        queue_size: int,
+        timeout: float,
+    ):
+        self.schemes = schemes
+        self.target_ms = target_ms
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.policy = default_policy(schemes)
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    async def start(self) -> None:
+        if self._executor is not None:
+            return
+        if self.target_ms:
+            self.policy = await asyncio.to_thread(calibrate_policy, self.schemes, self.target_ms / 1000)
+            logger.info("Password hashing calibrated to {}", self.policy)
+        _configure(self.policy)
+
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_configure,
+            initargs=(self.policy,),
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _release(self, weight: int, job: "asyncio.Future[Any]") -> None:
+        self.pending -= weight
+        # Nobody awaits a job whose caller timed out, so its error would otherwise be logged as never retrieved
+        if not job.cancelled():
+            job.exception()
+
+    async def _run(
+        self, func: Callable[..., T], *args: Any, weight: int = 1, timeout: Optional[float] = None
+    ) -> T:
+        # `weight` is how many hashes the call computes, each taking a place in the queue
+        if self.pending + weight > self.capacity:
+            password_hash_rejected.inc("queue_full")
+            raise PasswordHashingUnavailable()
+
+        # Take the places before the first call starts the pool, so calls arriving meanwhile count them
+        self.pending += weight
+        try:
+            if self._executor is None:
+                await self.start()
+            job = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except BaseException:
+            self.pending -= weight
+            raise
+        # A worker can't be interrupted, so the places are only freed once the job actually ends,
+        # not when the caller stops waiting for it
+        job.add_done_callback(partial(self._release, weight))
+
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(asyncio.shield(job), timeout or self.timeout)
+        except asyncio.TimeoutError as e:
+            password_hash_rejected.inc("timeout")
+            raise PasswordHashingUnavailable() from e
+        finally:
+            password_hash_duration.observe(time.perf_counter() - started, func.__name__.lstrip("_"))
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """
+        Hashes a batch a few passwords per call, with at most one call per worker in flight,
+        so logins coming meanwhile wait behind a few hashes rather than the whole batch.
+        Every password counts against the queue and gets the call timeout.
+        """
+        slots = asyncio.Semaphore(self.workers)
+
+        async def hash_chunk(chunk: list[str]) -> list[str]:
+            async with slots:
+                return await self._run(_hash_many, chunk, weight=len(chunk), timeout=self.timeout * len(chunk))
+
+        hashed = await asyncio.gather(
+            *(
+                hash_chunk(passwords[start:][:_HASH_MANY_CHUNK_SIZE])
+                for start in range(0, len(passwords), _HASH_MANY_CHUNK_SIZE)
+            )
+        )
+        return [password_hash for chunk in hashed for password_hash in chunk]
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """
+        Returns whether the password matches and, if the stored hash uses a deprecated scheme
+        or a lower cost than the current policy, a fresh hash to store instead.
+        """
+        return await self._run(_verify_and_update, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher(
+    schemes=app_settings.PASSWORD_HASH_SCHEMES,
+    target_ms=app_settings.PASSWORD_HASH_TARGET_MS,
+    workers=app_settings.PASSWORD_HASH_WORKERS,
+    queue_size=app_settings.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=app_settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+)
+
+registry.callback(
+    "password_hash_pending", "Hashing calls running or waiting for a worker", lambda: password_hasher.pending
+)
+registry.callback("password_hash_capacity", "Hashing calls accepted at once", lambda: password_hasher.capacity)
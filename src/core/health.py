@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import text
+
+from core.config import app_settings
+from core.hashing import password_hasher
+from core.metrics import registry
+from db.session import engine_async, pool_stats
+
+
+class HealthMonitor:
+    """
+    Pings the database in the background so readiness probes only read the last result,
+    however often and from however many places they come.
+    The pool and the hashing queue are read as the probe comes, since that costs nothing.
+    **Parameters**
+    * `interval`: Seconds between database pings
+    * `timeout`: Seconds a ping may take before the database counts as down
+    * `max_pool_usage`: Share of the pool's connections, overflow included, in use beyond which the worker
+      reports not ready, so it's taken out of rotation before requests start waiting for connections
+    """
+
+    def __init__(self, interval: float, timeout: float, max_pool_usage: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.max_pool_usage = max_pool_usage
+        self.database_up = False
+        self.database_error: Optional[str] = "Not checked yet"
+        self.database_latency = 0.0
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _ping(self) -> None:
+        async with engine_async.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    async def check(self) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._ping(), self.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.database_up or self.checked_at is None:
+                logger.warning("Database health check failed: {!r}", e)
+            self.database_up = False
+            self.database_error = repr(e)
+        else:
+            if not self.database_up and self.checked_at is not None:
+                logger.info("Database health check succeeded again")
+            self.database_up = True
+            self.database_error = None
+        self.database_latency = time.perf_counter() - started
+        self.checked_at = time.monotonic()
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    def status(self) -> dict[str, Any]:
+        age = None if self.checked_at is None else time.monotonic() - self.checked_at
+        # A check that stopped coming in, e.g. because the event loop is blocked, is no check at all
+        database_ok = self.database_up and age is not None and age < self.interval * 3 + self.timeout
+
+        pool = pool_stats()
+        pool_capacity = pool["size"] + pool["max_overflow"] if pool["max_overflow"] >= 0 else None
+        pool_usage = pool["checked_out"] / pool_capacity if pool_capacity else 0.0
+
+        return {
+            "ready": database_ok
+            and pool_usage < self.max_pool_usage
+            and password_hasher.pending < password_hasher.capacity,
+            "database": {
+                "up": database_ok,
+                "error": self.database_error or (None if database_ok else "The last check is too old"),
+                "latency_ms": round(self.database_latency * 1000, 3),
+                "checked_seconds_ago": None if age is None else round(age, 3),
+            },
+            "db_pool": {"checked_out": pool["checked_out"], "capacity": pool_capacity, "usage": pool_usage},
+            "password_hashing": {"pending": password_hasher.pending, "capacity": password_hasher.capacity},
+        }
+
+
+health_monitor = HealthMonitor(
+    interval=app_settings.HEALTH_CHECK_INTERVAL_SECONDS,
+    timeout=app_settings.HEALTH_CHECK_TIMEOUT_SECONDS,
+    max_pool_usage=app_settings.HEALTH_MAX_POOL_USAGE,
+)
+
+registry.callback(
+    "database_up", "Whether the last database health check succeeded", lambda: health_monitor.database_up
+)
+registry.callback(
+    "database_health_check_seconds",
+    "How long the last database health check took",
+    lambda: health_monitor.database_latency,
+)
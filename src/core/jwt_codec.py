@@ -0,0 +1,88 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import time
+from typing import Any
+
+import jwt
+import orjson
+
+from core.keys import HMAC_ALGORITHM, KeyRing, key_ring
+
+
+def b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+class JWTCodec:
+    """
+    Encodes and verifies every token the service issues.
+    HS256 tokens take a fast path: the header segment is serialized once, the HMAC key is set up once
+    and copied per token, and claims go through orjson. Tokens of asymmetric keys go through PyJWT.
+    Either way a token only verifies in its canonical encoding, so one token can't be re-encoded
+    into another string (and digest) that still verifies, e.g. to get past the revocation list.
+    Errors are PyJWT's, so callers handle both paths alike.
+    """
+
+    def __init__(self, keys: KeyRing):
+        self.keys = keys
+        self._hmac = hmac.new(keys.hmac_key.private_key.encode(), digestmod=hashlib.sha256)
+        self._hmac_header = b64encode(orjson.dumps({"alg": HMAC_ALGORITHM, "typ": "JWT"}))
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._hmac.copy()
+        mac.update(signing_input)
+        return b64encode(mac.digest())
+
+    def encode(self, claims: dict[str, Any]) -> str:
+        key = self.keys.signing_key
+        if key.kid is not None:
+            return jwt.encode(claims, key.private_key, algorithm=key.algorithm, headers={"kid": key.kid})
+
+        signing_input = self._hmac_header + b"." + b64encode(orjson.dumps(claims))
+        return (signing_input + b"." + self._sign(signing_input)).decode()
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict[str, Any]:
+        raw = token.encode()
+        signing_input, _, signature = raw.rpartition(b".")
+        header, _, payload = signing_input.partition(b".")
+        if header != self._hmac_header or not self.keys.accept_hmac:
+            return self._decode_with_pyjwt(token, verify_exp)
+
+        if not hmac.compare_digest(self._sign(signing_input), signature):
+            raise jwt.InvalidSignatureError("Signature verification failed")
+        try:
+            claims = orjson.loads(b64decode(payload))
+        except (binascii.Error, orjson.JSONDecodeError) as e:
+            raise jwt.DecodeError("Invalid payload") from e
+        if not isinstance(claims, dict):
+            raise jwt.DecodeError("Invalid payload")
+
+        if verify_exp and "exp" in claims:
+            if not isinstance(claims["exp"], int):
+                raise jwt.DecodeError("Expiration Time claim (exp) must be an integer")
+            if claims["exp"] <= time.time():
+                raise jwt.ExpiredSignatureError("Signature has expired")
+        return claims
+
+    def _decode_with_pyjwt(self, token: str, verify_exp: bool) -> dict[str, Any]:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self.keys.verification_key(kid)
+        if key is None:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid}")
+        claims: dict[str, Any] = jwt.decode(
+            token, key.public_key, algorithms=[key.algorithm], options={"verify_exp": verify_exp}
+        )
+        # PyJWT accepts signatures with stray or non-zero padding bits, which decode to the same bytes
+        signature = token.encode().rpartition(b".")[2]
+        if b64encode(b64decode(signature)) != signature:
+            raise jwt.InvalidSignatureError("Signature isn't canonically encoded")
+        return claims
+
+
+jwt_codec = JWTCodec(key_ring)
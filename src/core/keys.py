@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPublicKey
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from core.config import app_settings
+
+HMAC_ALGORITHM = "HS256"
+
+# Members of each key type that make up the RFC 7638 thumbprint
+_THUMBPRINT_MEMBERS = {"RSA": ("e", "kty", "n"), "OKP": ("crv", "kty", "x")}
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: Optional[str]
+    algorithm: str
+    private_key: Any
+    public_key: Any
+    jwk: Optional[dict[str, Any]] = None
+
+
+def _thumbprint(jwk: dict[str, Any]) -> str:
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk["kty"]]}
+    canonical = json.dumps(members, separators=(",", ":"), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(hashlib.sha256(canonical).digest()).rstrip(b"=").decode()
+
+
+def load_signing_key(path: str) -> SigningKey:
+    private_key = load_pem_private_key(Path(path).read_bytes(), password=None)
+    public_key = private_key.public_key()
+
+    if isinstance(public_key, RSAPublicKey):
+        algorithm = "RS256"
+        jwk = json.loads(RSAAlgorithm.to_jwk(public_key))
+    elif isinstance(public_key, Ed25519PublicKey):
+        algorithm = "EdDSA"
+        jwk = json.loads(OKPAlgorithm.to_jwk(public_key))
+    else:
+        raise ValueError(f"{path}: only RSA and Ed25519 private keys are supported")
+
+    kid = _thumbprint(jwk)
+    jwk.update(kid=kid, alg=algorithm, use="sig")
+    jwk.pop("key_ops", None)
+    return SigningKey(kid=kid, algorithm=algorithm, private_key=private_key, public_key=public_key, jwk=jwk)
+
+
+class KeyRing:
+    """
+    Keys used to sign and verify tokens.
+    **Parameters**
+    * `secret`: HMAC secret, signs and verifies tokens when no private keys are configured
+    * `private_key_paths`: PEM files of RSA or Ed25519 keys; the first one signs new tokens,
+      the rest are only published and accepted so tokens signed before a rotation stay valid
+    * `accept_hmac`: Keep verifying tokens without a `kid` with `secret` after switching to asymmetric keys
+    """
+
+    def __init__(self, secret: str, private_key_paths: list[str], accept_hmac: bool = False):
+        self.hmac_key = SigningKey(kid=None, algorithm=HMAC_ALGORITHM, private_key=secret, public_key=secret)
+        self.keys = [load_signing_key(path) for path in private_key_paths]
+        self.accept_hmac = accept_hmac or not self.keys
+        self._by_kid = {key.kid: key for key in self.keys}
+
+    @property
+    def signing_key(self) -> SigningKey:
+        return self.keys[0] if self.keys else self.hmac_key
+
+    def verification_key(self, kid: Optional[str]) -> Optional[SigningKey]:
+        if kid is None:
+            return self.hmac_key if self.accept_hmac else None
+        return self._by_kid.get(kid)
+
+    def jwks(self) -> dict[str, Any]:
+        return {"keys": [key.jwk for key in self.keys]}
+
+
+key_ring = KeyRing(app_settings.SECRET_KEY, app_settings.JWT_PRIVATE_KEY_FILES, app_settings.JWT_ACCEPT_HMAC)
@@ -0,0 +1,302 @@
+import bisect
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from db.tracing import QueryStats, query_stats, report_repeats
+
+LabelValues = tuple[str, ...]
+Sample = Union[float, dict[LabelValues, float]]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    @abstractmethod
+    def render(self) -> list[str]:
+        """
+        The metric's lines in the Prometheus text exposition format, its HELP and TYPE lines first.
+        """
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """
+    Observations are counted in their own bucket only; buckets are made cumulative when rendered,
+    which keeps `observe` to one bisect and three additions.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label values: counts per bucket (the last one is +Inf), sum, count
+        self._series: dict[LabelValues, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+        counts, totals = series
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return int(series[1][1]) if series else 0
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        bucket_labels = self.labelnames + ("le",)
+        for labels, (counts, (total, count)) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                bucket = _format_labels(bucket_labels, labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {_format_value(count)}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """
+    A gauge or counter whose value is read from elsewhere when metrics are collected,
+    for state other components already keep track of.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Sample],
+        labelnames: tuple[str, ...] = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        sample = self.callback()
+        values = sample if isinstance(sample, dict) else {(): sample}
+        for labels, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Sample],
+        labelnames: tuple[str, ...] = (),
+        kind: str = "gauge",
+    ) -> CallbackMetric:
+        metric = CallbackMetric(name, documentation, callback, labelnames, kind)
+        self.register(metric)
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "Requests handled, by route template and status", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of the response",
+    ("method", "route", "status"),
+)
+request_db_duration = registry.histogram(
+    "http_request_db_seconds", "Time spent executing SQL statements per request", ("route",)
+)
+request_db_queries = registry.histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50),
+)
+password_hash_duration = registry.histogram(
+    "password_hash_seconds",
+    "Time a password hashing call took, including waiting for a free worker",
+    ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0),
+)
+password_hash_rejected = registry.counter(
+    "password_hash_rejected_total", "Hashing calls rejected because the worker pool was saturated", ("reason",)
+)
+db_pool_checkout_duration = registry.histogram(
+    "db_pool_checkout_seconds",
+    "Time to check a connection out of the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+logins = registry.counter("logins_total", "Login attempts by outcome", ("outcome",))
+token_refreshes = registry.counter("token_refreshes_total", "Token refreshes by outcome", ("outcome",))
+api_errors = registry.counter("api_errors_total", "Error responses by error code", ("code",))
+unhandled_exceptions = registry.counter(
+    "unhandled_exceptions_total", "Unexpected exceptions turned into a generic error", ("exception",)
+)
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    Records the count, latency and SQL time of every HTTP request, labelled by route template
+    rather than by path, so path parameters and unknown URLs don't create new series.
+    Identical statements a request ran more than once are logged once it's over.
+    **Parameters**
+    * `routes`: The app's routes, read lazily so routers included after the middleware are known too
+    * `debug_headers`: Whether responses tell how many statements were run before they started, and their time
+    """
+
+    def __init__(self, app: ASGIApp, routes: Sequence[BaseRoute], debug_headers: bool = False):
+        self.app = app
+        self.routes = routes
+        self.debug_headers = debug_headers
+        self._templates: dict[Any, str] = {}
+
+    def _route(self, scope: Scope) -> str:
+        # Starlette's router stores the matched endpoint in the scope
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        template = self._templates.get(endpoint)
+        if template is None:
+            for route in self.routes:
+                if getattr(route, "endpoint", None) is not None:
+                    self._templates.setdefault(route.endpoint, route.path)  # type: ignore[attr-defined]
+            template = self._templates.setdefault(endpoint, UNMATCHED_ROUTE)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+        stats = QueryStats(route=f"{scope['method']} {scope['path']}")
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                if self.debug_headers:
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (b"x-db-query-count", str(stats.queries).encode()),
+                        (b"x-db-query-time-ms", f"{stats.seconds * 1000:.3f}".encode()),
+                    ]
+            await send(message)
+
+        token = query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            query_stats.reset(token)
+            route = self._route(scope)
+            http_requests.inc(scope["method"], route, status)
+            http_request_duration.observe(elapsed, scope["method"], route, status)
+            request_db_duration.observe(stats.seconds, route)
+            request_db_queries.observe(stats.queries, route)
+            report_repeats(stats)
@@ -0,0 +1,26 @@
+import binascii
+import datetime
+
+import orjson
+
+from core.jwt_codec import b64decode, b64encode
+from exceptions import InvalidCursor
+
+
+def encode_cursor(created_at: datetime.datetime, email: str) -> str:
+    """
+    An opaque cursor for the page after the user with this creation time and email.
+    """
+    return b64encode(orjson.dumps([created_at.isoformat(), email])).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, str]:
+    try:
+        created_at, email = orjson.loads(b64decode(cursor.encode()))
+        created_at = datetime.datetime.fromisoformat(created_at)
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor() from e
+    # Creation times are stored without a time zone, so no cursor made by `encode_cursor` has one
+    if created_at.tzinfo is not None:
+        raise InvalidCursor()
+    return created_at, str(email)
@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+import time
+from typing import Any, Iterable, Optional
+
+import asyncpg
+from loguru import logger
+from sqlalchemy.engine import make_url
+
+import crud
+from core.config import app_settings
+from core.metrics import registry
+from crud.crud_revoked_token import REVOCATION_CHANNEL
+from db.session import async_session
+
+
+class RevocationList:
+    """
+    Digests of revoked access tokens that haven't expired yet, mapped to their expiry.
+    Entries past their expiry are harmless, such tokens fail the `exp` check anyway, and are pruned lazily.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[bytes, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, access_token_hash: bytes) -> bool:
+        return access_token_hash in self._entries
+
+    def add(self, access_token_hash: bytes, expires_at: float) -> None:
+        if expires_at > time.time():
+            self._entries[access_token_hash] = expires_at
+
+    def replace(self, entries: Iterable[tuple[bytes, float]]) -> None:
+        now = time.time()
+        self._entries = {digest: expires_at for digest, expires_at in entries if expires_at > now}
+
+    def prune(self) -> None:
+        now = time.time()
+        self._entries = {digest: expires_at for digest, expires_at in self._entries.items() if expires_at > now}
+
+
+revocation_list = RevocationList()
+registry.callback(
+    "revoked_access_tokens", "Revoked access tokens not expired yet", lambda: len(revocation_list)
+)
+
+
+def _timestamp(value: datetime.datetime) -> float:
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class RevocationListener:
+    """
+    Keeps `revocation_list` in sync across workers: loads the active revocations on connect
+    and then applies `token_revoked` notifications. On connection loss it reconnects and reloads,
+    which also picks up anything revoked while it was disconnected.
+    """
+
+    def __init__(self, revoked: RevocationList, dsn: str, reconnect_delay: float, prune_interval: float):
+        self.revoked = revoked
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self.prune_interval = prune_interval
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    async def start(self, timeout: float = 10.0) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Revocation list isn't loaded yet, revoked tokens are accepted until it is")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        for entry in payload.split(","):
+            digest, _, expires_at = entry.partition(":")
+            self.revoked.add(bytes.fromhex(digest), float(expires_at))
+
+    async def _load(self) -> None:
+        async with async_session() as db:
+            active = await crud.revoked_token.get_active(db)
+        self.revoked.replace((digest, _timestamp(expires_at)) for digest, expires_at in active)
+
+    async def _listen(self) -> None:
+        connection = await asyncpg.connect(self.dsn)
+        closed = asyncio.Event()
+        connection.add_termination_listener(lambda _: closed.set())
+        try:
+            # Listen before loading, so nothing revoked in between is missed
+            await connection.add_listener(REVOCATION_CHANNEL, self._on_notification)
+            await self._load()
+            self._ready.set()
+            while not closed.is_set():
+                try:
+                    await asyncio.wait_for(closed.wait(), self.prune_interval)
+                except asyncio.TimeoutError:
+                    self.revoked.prune()
+        finally:
+            await connection.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Revocation listener disconnected: {}", e)
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def _listener_dsn(database_uri: Optional[str]) -> str:
+    # asyncpg connects with the engine's URL minus the SQLAlchemy driver name
+    if database_uri is None:
+        raise ValueError("SQLALCHEMY_DATABASE_URI_ASYNC is not set")
+    return make_url(database_uri).set(drivername="postgresql").render_as_string(False)
+
+
+revocation_listener = RevocationListener(
+    revocation_list,
+    dsn=_listener_dsn(app_settings.SQLALCHEMY_DATABASE_URI_ASYNC),
+    reconnect_delay=app_settings.REVOCATION_RECONNECT_SECONDS,
+    prune_interval=app_settings.REVOCATION_PRUNE_SECONDS,
+)
@@ -1,67 +1,51 @@
-from datetime import datetime, timedelta
+import hashlib
+import time
+from datetime import timedelta
 from typing import Any, Optional
 
-import jwt as py_jwt
-from fastapi import HTTPException
-from jose import jwt
-from passlib.context import CryptContext
-from starlette import status
-from starlette.requests import Request
-
 from core.config import app_settings
-from db.models import User
+from core.hashing import password_hasher
+from core.jwt_codec import jwt_codec
+from db.models.user import UserRole
+
+
+def _expires_at(expires_delta: timedelta) -> int:
+    return int(time.time() + expires_delta.total_seconds())
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def create_access_token(
+    email: str, role: UserRole, session_id: str, expires_delta: Optional[timedelta] = None
+) -> str:
+    expire = _expires_at(expires_delta or timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    access_body = {"user_id": email, "role": role.value, "sid": session_id, "exp": expire}
+    return encode_token(access_body)
 
-ALGORITHM = "HS256"
 
+def create_refresh_token(email: str, session_id: str, expires_delta: Optional[timedelta] = None) -> str:
+    expire = _expires_at(expires_delta or timedelta(days=app_settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    refresh_body = {"email": email, "sid": session_id, "exp": expire}
+    return encode_token(refresh_body)
 
-def create_access_token(user: User, expires_delta: Optional[timedelta] = None) -> Any:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=app_settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_body = {"user_id": user.email, "role": user.role.value, "exp": expire}
-    encoded_jwt = jwt.encode(access_body, app_settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
 
+def encode_token(payload: dict[str, Any]) -> str:
+    return jwt_codec.encode(payload)
 
-def create_refresh_token(user: User, expires_delta: Optional[timedelta] = None) -> Any:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(days=app_settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
-    access_body = {
-        "email": user.email,
-        "created_at": user.created_at.strftime("MM:SS"),
-        "exp": expire,
-    }
-    encoded_jwt = jwt.encode(access_body, app_settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def decode_access_token(raw_jwt: str, verify_exp: bool = True) -> dict[str, Any]:
+    return jwt_codec.decode(raw_jwt, verify_exp=verify_exp)
 
 
-def encode_access_token(request: Request) -> Any:
-    unauthorized_exc = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
-    raw_jwt = request.cookies.get("jwt-access")
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
 
-    if raw_jwt is None:
-        raise unauthorized_exc
-    try:
-        payload = jwt.decode(
-            raw_jwt,
-            app_settings.SECRET_KEY,
-            algorithms=["HS256"],
-        )
-    except py_jwt.PyJWTError as e:
-        raise unauthorized_exc from e
 
-    return payload
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> Any:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return await password_hasher.verify_and_update(plain_password, hashed_password)
 
 
-def get_password_hash(password: str) -> Any:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+import random
+import time
+from typing import Any, Optional
+
+from loguru import logger
+
+import crud
+from core.config import app_settings
+from core.metrics import registry
+from db.session import async_session
+
+
+class ExpiredSessionSweeper:
+    """
+    Periodically deletes sessions whose refresh token has expired and revocations of access tokens
+    that have expired, in batches of `batch_size` rows with a commit after each, so no batch holds
+    row locks on the hot tables for long.
+    **Parameters**
+    * `interval`: Seconds between sweeps, 0 disables the sweeper
+    * `batch_size`: Rows deleted per statement
+    * `jitter`: Fraction of the interval each sleep is randomly stretched or shortened by,
+      so workers started together don't sweep in lockstep
+    """
+
+    def __init__(self, interval: float, batch_size: int, jitter: float):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.jitter = jitter
+        self.runs = 0
+        self.failures = 0
+        self.removed_sessions = 0
+        self.removed_revocations = 0
+        self.last_run_seconds = 0.0
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "removed_sessions": self.removed_sessions,
+            "removed_revocations": self.removed_revocations,
+            "last_run_seconds": self.last_run_seconds,
+        }
+
+    def _delay(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _remove_expired(self, remove: Any) -> int:
+        removed = 0
+        while True:
+            async with async_session() as db:
+                count = await remove(db, now=datetime.datetime.utcnow(), limit=self.batch_size)
+                await db.commit()
+            removed += count
+            if count < self.batch_size:
+                return removed
+
+    async def sweep(self) -> tuple[int, int]:
+        started = time.perf_counter()
+        sessions = await self._remove_expired(crud.token.remove_expired)
+        revocations = await self._remove_expired(crud.revoked_token.remove_expired)
+
+        self.runs += 1
+        self.removed_sessions += sessions
+        self.removed_revocations += revocations
+        self.last_run_seconds = time.perf_counter() - started
+        if sessions or revocations:
+            logger.info("Swept {} expired sessions and {} expired revocations", sessions, revocations)
+        return sessions, revocations
+
+    async def _run(self) -> None:
+        # A random first delay spreads the sweeps of workers that started at the same time
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning("Expired session sweep failed: {}", e)
+            await asyncio.sleep(self._delay())
+
+
+session_sweeper = ExpiredSessionSweeper(
+    interval=app_settings.SESSION_SWEEP_INTERVAL_SECONDS,
+    batch_size=app_settings.SESSION_SWEEP_BATCH_SIZE,
+    jitter=app_settings.SESSION_SWEEP_JITTER,
+)
+
+registry.callback(
+    "swept_rows_total",
+    "Expired rows deleted by the sweeper",
+    lambda: {
+        ("token",): session_sweeper.removed_sessions,
+        ("revokedtoken",): session_sweeper.removed_revocations,
+    },
+    ("table",),
+    kind="counter",
+)
+registry.callback("sweeps_total", "Completed sweeps", lambda: session_sweeper.runs, kind="counter")
+registry.callback(
+    "sweep_failures_total", "Sweeps that failed", lambda: session_sweeper.failures, kind="counter"
+)
@@ -0,0 +1,70 @@
+import csv
+import io
+from typing import AsyncIterator, Sequence
+
+import orjson
+from sqlalchemy.engine import Row
+
+import crud
+from core.config import app_settings
+from db.session import async_session
+from schemas.user import FileFormat
+
+EXPORT_FIELDS = ("email", "full_name", "role", "is_banned", "is_superuser", "created_at")
+MEDIA_TYPES = {FileFormat.CSV: "text/csv", FileFormat.JSONL: "application/x-ndjson"}
+
+
+def _encode_csv(rows: Sequence[Row]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            (
+                row.email,
+                row.full_name,
+                row.role.value,
+                row.is_banned,
+                row.is_superuser,
+                row.created_at.isoformat(),
+            )
+        )
+    return buffer.getvalue().encode()
+
+
+def _encode_jsonl(rows: Sequence[Row]) -> bytes:
+    return b"".join(
+        orjson.dumps(
+            {
+                "email": row.email,
+                "full_name": row.full_name,
+                "role": row.role.value,
+                "is_banned": row.is_banned,
+                "is_superuser": row.is_superuser,
+                "created_at": row.created_at,
+            },
+            option=orjson.OPT_APPEND_NEWLINE,
+        )
+        for row in rows
+    )
+
+
+async def export_users(
+    file_format: FileFormat, page_size: int = app_settings.USER_EXPORT_PAGE_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Yields all users a page at a time, in email order, each page read after the last email of the one before.
+    Every page is read in its own short session, so a slow client holds neither a connection nor a snapshot.
+    """
+    if file_format == FileFormat.CSV:
+        yield (",".join(EXPORT_FIELDS) + "\r\n").encode()
+    encode = _encode_csv if file_format == FileFormat.CSV else _encode_jsonl
+
+    after = None
+    while True:
+        async with async_session() as db:
+            rows = await crud.user.get_multi_after(db, after=after, limit=page_size)
+        if rows:
+            yield encode(rows)
+        if len(rows) < page_size:
+            return
+        after = rows[-1].email
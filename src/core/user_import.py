@@ -0,0 +1,206 @@
+import csv
+import datetime
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Optional, Union
+
+import orjson
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+from core.config import app_settings
+from core.hashing import password_hasher
+from db.models.user import UserRole
+from schemas.user import FileFormat, UserImportError, UserImportReport, UserImportRow
+
+if TYPE_CHECKING:
+    # Only declared for type checkers
+    from pydantic.error_wrappers import ErrorDict
+
+ProgressCallback = Callable[[UserImportReport], None]
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def read_records(
+    chunks: AsyncIterator[bytes], file_format: FileFormat
+) -> AsyncIterator[tuple[int, Union[dict[str, Any], str]]]:
+    """
+    Yields the line number and the fields of every non-blank line, or an error message if it can't be parsed.
+    CSV needs a header row and one record per line; its empty cells are left out.
+    """
+    header: Optional[list[str]] = None
+    line_number = 0
+    async for raw_line in _lines(chunks):
+        line_number += 1
+        try:
+            line = raw_line.decode("utf-8-sig" if line_number == 1 else "utf-8").rstrip("\r")
+        except UnicodeDecodeError:
+            yield line_number, "Not valid UTF-8"
+            continue
+        if not line.strip():
+            continue
+
+        if file_format == FileFormat.JSONL:
+            try:
+                fields = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                yield line_number, "Not valid JSON"
+                continue
+            yield line_number, fields if isinstance(fields, dict) else "Not a JSON object"
+            continue
+
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield line_number, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield line_number, {name: value for name, value in zip(header, values) if value != ""}
+
+
+def _format_error(error: "ErrorDict") -> str:
+    field = ".".join(str(part) for part in error["loc"] if part != "__root__")
+    return f"{field}: {error['msg']}" if field else str(error["msg"])
+
+
+def log_progress(report: UserImportReport) -> None:
+    logger.info(
+        "User import: {} rows read, {} imported, {} duplicates, {} failed",
+        report.rows,
+        report.imported,
+        report.duplicates,
+        report.failed,
+    )
+
+
+class UserImporter:
+    """
+    Creates users in bulk from a stream of CSV or JSON lines, holding no more than a batch in memory.
+    The plain passwords of a batch are hashed on all hashing workers at once, and the batch is written
+    with COPY and committed on its own: a failed import keeps the batches before it, and running it
+    again skips the users that already exist.
+    **Parameters**
+    * `batch_size`: Rows hashed and written per transaction
+    * `max_errors`: Row errors listed in the report; later ones are only counted
+    """
+
+    def __init__(self, batch_size: int, max_errors: int):
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def _add_error(self, report: UserImportReport, line: int, email: Optional[str], error: str) -> None:
+        if len(report.errors) < self.max_errors:
+            report.errors.append(UserImportError(line=line, email=email, error=error))
+
+    def _fail(self, report: UserImportReport, line: int, email: Optional[str], error: str) -> None:
+        report.failed += 1
+        self._add_error(report, line, email, error)
+
+    def _validate(
+        self,
+        report: UserImportReport,
+        line: int,
+        fields: Union[dict[str, Any], str],
+        creator_role: Optional[UserRole],
+    ) -> Optional[UserImportRow]:
+        if isinstance(fields, str):
+            self._fail(report, line, None, fields)
+            return None
+
+        email = fields.get("email")
+        email = email if isinstance(email, str) else None
+        try:
+            row = UserImportRow.parse_obj(fields)
+        except ValidationError as e:
+            self._fail(report, line, email, "; ".join(map(_format_error, e.errors())))
+            return None
+
+        if creator_role is not None and not row.role.is_child_of(creator_role):
+            self._fail(report, line, email, "Not allowed to create users with this role")
+            return None
+        return row
+
+    async def _write(
+        self, db: AsyncSession, report: UserImportReport, batch: dict[str, tuple[int, UserImportRow]]
+    ) -> None:
+        rows = [row for _, row in batch.values()]
+        hashes = iter(await password_hasher.hash_many([row.password for row in rows if row.password]))
+        now = datetime.datetime.now()
+        records = [
+            (
+                row.email,
+                row.full_name,
+                row.role.name,
+                row.hashed_password or next(hashes),
+                False,
+                row.role == UserRole.SUPERUSER,
+                now,
+            )
+            for row in rows
+        ]
+        try:
+            inserted = set(await crud.user.import_batch(db, rows=records))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        report.imported += len(inserted)
+        for email, (line, _) in batch.items():
+            if email not in inserted:
+                report.duplicates += 1
+                self._add_error(report, line, email, "A user with this email already exists")
+
+    async def run(
+        self,
+        db: AsyncSession,
+        chunks: AsyncIterator[bytes],
+        file_format: FileFormat,
+        *,
+        creator_role: Optional[UserRole] = None,
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> UserImportReport:
+        """
+        Imports every row of `chunks`, calling `on_progress` after each batch.
+        With a `creator_role`, only users of lower roles may be created, as when force-creating one.
+        """
+        report = UserImportReport()
+        started = time.perf_counter()
+        batch: dict[str, tuple[int, UserImportRow]] = {}
+        async for line, fields in read_records(chunks, file_format):
+            report.rows += 1
+            row = self._validate(report, line, fields, creator_role)
+            if row is None:
+                continue
+            if row.email in batch:
+                self._fail(report, line, row.email, "The email is repeated in the file")
+                continue
+
+            batch[row.email] = (line, row)
+            if len(batch) >= self.batch_size:
+                await self._write(db, report, batch)
+                batch = {}
+                report.seconds = time.perf_counter() - started
+                if on_progress is not None:
+                    on_progress(report)
+
+        if batch:
+            await self._write(db, report, batch)
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+user_importer = UserImporter(
+    batch_size=app_settings.USER_IMPORT_BATCH_SIZE, max_errors=app_settings.USER_IMPORT_MAX_ERRORS
+)
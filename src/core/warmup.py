@@ -0,0 +1,53 @@
+import asyncio
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+import crud
+from db.session import async_session, engine_async
+from token_store import token_store
+
+
+async def _run_hot_statements(connection: AsyncConnection) -> None:
+    async with async_session(bind=connection) as db:
+        try:
+            # Sessions reference a user, and the superuser is the one known to exist
+            admin = await crud.user.get_admin(db)
+            if admin is not None:
+                await crud.user.get_by_email(db, email=admin.email)
+                await token_store.warm_up(db, email=admin.email)
+        finally:
+            await db.rollback()
+
+
+async def warm_up_pool(size: int) -> None:
+    """
+    Opens `size` connections at once, so they all stay in the pool, and runs the statements of logins
+    and refreshes on each, on behalf of the superuser and in a transaction that is rolled back.
+    That leaves them compiled in SQLAlchemy's cache and prepared in every connection's statement cache.
+    Failures are only logged; the worker still starts and connects as requests come.
+    """
+    finished: set[int] = set()
+    all_finished = asyncio.Event()
+
+    def finish(index: int) -> None:
+        finished.add(index)
+        if len(finished) == size:
+            all_finished.set()
+
+    async def warm_up_connection(index: int) -> None:
+        try:
+            async with engine_async.connect() as connection:
+                await _run_hot_statements(connection)
+                finish(index)
+                # Hold on to the connection until every one is warm, or the next would just reuse it
+                await all_finished.wait()
+        finally:
+            finish(index)
+
+    results = await asyncio.gather(
+        *(warm_up_connection(index) for index in range(size)), return_exceptions=True
+    )
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        logger.warning("Warming up {} of {} database connections failed: {!r}", len(errors), size, errors[0])
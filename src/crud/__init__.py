@@ -1,2 +1,3 @@
+from .crud_revoked_token import revoked_token
 from .crud_token import token
 from .crud_user import user
@@ -1,9 +1,15 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import datetime
+from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union, cast
 
-from fastapi.encoders import jsonable_encoder
+import orjson
 from pydantic import BaseModel
+from sqlalchemy import Column, DateTime, Table, delete, inspect, literal_column
+from sqlalchemy.engine import CursorResult
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.expression import select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.expression import ClauseElement, Select, select
 
 from db.base_class import Base
 
@@ -12,6 +18,46 @@ CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
 
+async def remove_expired_batch(
+    db: AsyncSession, table: Table, expires_at: Column[DateTime], *, now: datetime.datetime, limit: int
+) -> int:
+    """
+    Deletes up to `limit` rows whose `expires_at` has passed, addressing them by ctid so the delete
+    doesn't search the table a second time. Rows locked by other transactions are left for the next batch.
+    """
+    ctid = literal_column("ctid")
+    batch = (
+        select(ctid).select_from(table).where(expires_at < now).limit(limit).with_for_update(skip_locked=True)
+    )
+    # A DELETE without RETURNING always comes back as a CursorResult, which has the row count
+    result = cast(CursorResult, await db.execute(delete(table).where(ctid.in_(batch))))
+    return result.rowcount
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + str(compiler.process(element.statement, **kw))
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """
+    The planner's estimate of how many rows `query` returns, from table statistics rather than
+    by counting them, so it costs the same at any table size but is only as accurate as the last ANALYZE.
+    """
+    result = await db.execute(Explain(query))
+    plan = result.scalar_one()
+    if isinstance(plan, (str, bytes)):
+        plan = orjson.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         """
@@ -37,28 +83,26 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj_in_data = obj_in.dict()
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
         return db_obj
 
     async def update(
         self, db: AsyncSession, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        columns = inspect(db_obj).mapper.column_attrs.keys()
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
+        for field in columns:
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
         return db_obj
 
     async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
         obj = await self.get(db, id)
         await db.delete(obj)
-        await db.commit()
+        await db.flush()
         return obj
@@ -0,0 +1,55 @@
+import datetime
+from typing import Collection
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud.base import remove_expired_batch
+from db.models.revoked_token import RevokedToken
+
+REVOCATION_CHANNEL = "token_revoked"
+NOTIFY_BATCH_SIZE = 100
+
+
+class CRUDRevokedToken:
+    async def get_active(self, db: AsyncSession) -> list[tuple[bytes, datetime.datetime]]:
+        result = await db.execute(
+            select(RevokedToken.access_token_hash, RevokedToken.expires_at).filter(
+                RevokedToken.expires_at > datetime.datetime.utcnow()
+            )
+        )
+        return [(row.access_token_hash, row.expires_at) for row in result]
+
+    async def revoke(
+        self, db: AsyncSession, *, access_token_hash: bytes, expires_at: datetime.datetime
+    ) -> None:
+        await self.revoke_many(db, access_token_hashes=[access_token_hash], expires_at=expires_at)
+
+    async def revoke_many(
+        self, db: AsyncSession, *, access_token_hashes: Collection[bytes], expires_at: datetime.datetime
+    ) -> None:
+        """
+        Records the revocations and notifies every worker once the transaction commits.
+        """
+        if not access_token_hashes:
+            return
+        await db.execute(
+            insert(RevokedToken)
+            .values([{"access_token_hash": digest, "expires_at": expires_at} for digest in access_token_hashes])
+            .on_conflict_do_nothing()
+        )
+        expires_ts = int(expires_at.replace(tzinfo=datetime.timezone.utc).timestamp())
+        entries = [f"{digest.hex()}:{expires_ts}" for digest in access_token_hashes]
+        # Notification payloads are limited to 8000 bytes
+        for start in range(0, len(entries), NOTIFY_BATCH_SIZE):
+            batch = entries[start:][:NOTIFY_BATCH_SIZE]
+            await db.execute(select(func.pg_notify(REVOCATION_CHANNEL, ",".join(batch))))
+
+    async def remove_expired(self, db: AsyncSession, *, now: datetime.datetime, limit: int) -> int:
+        return await remove_expired_batch(
+            db, inspect(RevokedToken).local_table, RevokedToken.expires_at, now=now, limit=limit
+        )
+
+
+revoked_token = CRUDRevokedToken()
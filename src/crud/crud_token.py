@@ -1,33 +1,108 @@
-from typing import Any, Dict, Optional, Union
+import datetime
+from typing import Any, Dict, Iterable, Optional, Union
 
-from sqlalchemy import select
+from sqlalchemy import delete, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from crud.base import CRUDBase
-from db.models.user import Token
+from crud.base import CRUDBase, remove_expired_batch
+from db.models.user import Token, User, UserRole
 from schemas.token import TokenCreate, TokenUpdate
 
 
 class CRUDToken(CRUDBase[Token, TokenCreate, TokenUpdate]):
-    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[Token]:
-        result = await db.execute(select(Token).filter(Token.email == email))
-        return result.scalars().first()
+    async def get_multi_by_email(self, db: AsyncSession, *, email: str) -> list[Token]:
+        result = await db.execute(select(Token).filter(Token.email == email).order_by(Token.created_at))
+        return list(result.scalars().all())
 
-    async def get_by_access_token(self, db: AsyncSession, *, access_token: str) -> Optional[Token]:
-        result = await db.execute(select(Token).filter(Token.access_token == access_token))
+    async def get_by_access_token_hash(self, db: AsyncSession, *, access_token_hash: bytes) -> Optional[Token]:
+        result = await db.execute(select(Token).filter(Token.access_token_hash == access_token_hash))
         return result.scalars().first()
 
-    async def create(self, db: AsyncSession, *, obj_in: TokenCreate) -> Token:
-        db_obj = Token(
-            email=obj_in.email,
-            access_token=obj_in.access_token,
-            refresh_token=obj_in.refresh_token,
+    async def get_existing_access_token_hashes(
+        self, db: AsyncSession, *, access_token_hashes: Iterable[bytes]
+    ) -> set[bytes]:
+        """
+        The digests among `access_token_hashes` whose sessions exist and haven't expired yet.
+        """
+        result = await db.execute(
+            select(Token.access_token_hash).filter(
+                Token.access_token_hash.in_(list(access_token_hashes)),
+                Token.expires_at > datetime.datetime.utcnow(),
+            )
         )
+        return set(result.scalars().all())
+
+    async def create(self, db: AsyncSession, *, obj_in: TokenCreate) -> Token:
+        db_obj = Token(**obj_in.dict())
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
         return db_obj
 
+    async def create_capped(self, db: AsyncSession, *, obj_in: TokenCreate, max_sessions: int) -> list[bytes]:
+        """
+        Starts a session and, in the same statement, ends the user's oldest ones so that at most
+        `max_sessions` remain (0 means no limit). Returns the access token digests of the ended sessions.
+        """
+        stmt = insert(Token).values(**obj_in.dict(), created_at=datetime.datetime.utcnow())
+        if max_sessions <= 0:
+            await db.execute(stmt)
+            return []
+
+        oldest = (
+            select(Token.id)
+            .filter(Token.email == obj_in.email)
+            .order_by(Token.created_at.desc(), Token.id)
+            .offset(max_sessions - 1)
+        )
+        # The insert runs as a CTE of the delete, which still sees the sessions as they were before it.
+        # add_cte() came with SQLAlchemy 1.4.21, after the stubs were written, so they lack it.
+        result = await db.execute(
+            delete(Token)
+            .where(Token.id.in_(oldest))
+            .returning(Token.access_token_hash)
+            .add_cte(stmt.cte("inserted"))  # type: ignore[attr-defined]
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def rotate(
+        self, db: AsyncSession, *, access_token_hash: bytes, refresh_token_hash: bytes, obj_in: TokenUpdate
+    ) -> Optional[tuple[str, UserRole]]:
+        """
+        Swaps the session's tokens for new ones if both current digests still match, the session hasn't expired
+        and the user isn't banned. Returns the user's email and role, or None if nothing was swapped.
+        Only the session's own row is locked, so other sessions of the user refresh concurrently.
+        """
+        stmt = (
+            update(Token)
+            .where(
+                Token.email == User.email,
+                Token.access_token_hash == access_token_hash,
+                Token.refresh_token_hash == refresh_token_hash,
+                # Expired sessions stay in the table until the sweeper gets to them
+                Token.expires_at > datetime.datetime.utcnow(),
+                User.is_banned.is_not(True),
+            )
+            .values(**obj_in.dict())
+            .returning(User.email, User.role)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(stmt)
+        row = result.first()
+        return (row.email, row.role) if row else None
+
+    async def remove_by_hashes(
+        self, db: AsyncSession, *, access_token_hash: bytes, refresh_token_hash: bytes
+    ) -> Optional[str]:
+        result = await db.execute(
+            delete(Token)
+            .where(Token.access_token_hash == access_token_hash, Token.refresh_token_hash == refresh_token_hash)
+            .returning(Token.email)
+            .execution_options(synchronize_session=False)
+        )
+        return result.scalar_one_or_none()
+
     async def update(
         self, db: AsyncSession, *, db_obj: Token, obj_in: Union[TokenUpdate, Dict[str, Any]]
     ) -> Token:
@@ -37,11 +112,26 @@ class CRUDToken(CRUDBase[Token, TokenCreate, TokenUpdate]):
             update_data = obj_in.dict(exclude_unset=True)
         return await super().update(db, db_obj=db_obj, obj_in=update_data)
 
-    async def remove_by_email(self, db: AsyncSession, *, email: str) -> Optional[Token]:
-        obj = await self.get_by_email(db, email=email)
-        await db.delete(obj)
-        await db.commit()
-        return obj
+    async def remove_by_email(self, db: AsyncSession, *, email: str) -> list[bytes]:
+        """
+        Ends every session of the user. Returns their access token digests.
+        """
+        result = await db.execute(
+            delete(Token)
+            .where(Token.email == email)
+            .returning(Token.access_token_hash)
+            .execution_options(synchronize_session=False)
+        )
+        return list(result.scalars().all())
+
+    async def remove_expired(self, db: AsyncSession, *, now: datetime.datetime, limit: int) -> int:
+        """
+        Deletes up to `limit` expired sessions, skipping rows other transactions hold locked.
+        Returns how many were deleted.
+        """
+        return await remove_expired_batch(
+            db, inspect(Token).local_table, Token.expires_at, now=now, limit=limit
+        )
 
 
 token = CRUDToken(Token)
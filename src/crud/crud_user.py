@@ -1,23 +1,159 @@
-from typing import Any, Dict, Optional, Union
+import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
 
+from sqlalchemy import column, desc, func, literal, or_, table, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.sql import ColumnElement, Select
 
-from core.security import get_password_hash, verify_password
-from crud.base import CRUDBase
+from core.security import get_password_hash, verify_and_update_password
+from crud.base import CRUDBase, estimate_count
 from db.models.user import User, UserRole
 from schemas.user import UserCreate, UserForceCreate, UserUpdate
 
 
+def _local_time(value: datetime.datetime) -> datetime.datetime:
+    # created_at holds the server's local time without a zone
+    return value.astimezone().replace(tzinfo=None) if value.tzinfo else value
+
+
+# Any number unique among the advisory locks taken on the database
+SUPERUSER_SEED_LOCK = 0x5EED_5A17
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+
+IMPORT_COLUMNS = ("email", "full_name", "role", "hashed_password", "is_banned", "is_superuser", "created_at")
+_import_table = table("user_import", *(column(name) for name in IMPORT_COLUMNS))
+SUMMARY_COLUMNS = (User.email, User.full_name, User.role, User.is_banned, User.is_superuser, User.created_at)
+
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
         result = await db.execute(select(User).filter(User.email == email))
         return result.scalars().first()
 
     async def get_admin(self, db: AsyncSession) -> Optional[User]:
-        result = await db.execute(select(User).filter(User.role == UserRole.SUPERUSER))
+        result = await db.execute(select(User).filter(User.role == UserRole.SUPERUSER).limit(1))
         return result.scalars().first()
 
+    async def create_superuser_once(self, db: AsyncSession, *, obj_in: UserForceCreate) -> bool:
+        """
+        Creates the superuser unless there already is one, or a user with its email.
+        Holds an advisory lock until the transaction ends, so workers starting together create it once.
+        Returns whether it was created, which it isn't either if an ordinary user has its email.
+        """
+        await db.execute(select(func.pg_advisory_xact_lock(SUPERUSER_SEED_LOCK)))
+        if await self.get_admin(db) is not None:
+            return False
+
+        result = await db.execute(
+            insert(User)
+            .values(
+                email=obj_in.email,
+                full_name=obj_in.full_name,
+                role=UserRole.SUPERUSER,
+                hashed_password=await get_password_hash(obj_in.password),
+                is_banned=False,
+                is_superuser=True,
+                created_at=datetime.datetime.now(),
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.email)
+        )
+        return result.scalar_one_or_none() is not None
+
+    async def get_multi_after(self, db: AsyncSession, *, after: Optional[str], limit: int) -> List[Row]:
+        """
+        The `SUMMARY_COLUMNS` of up to `limit` users whose email sorts after `after`, in email order.
+        Unlike `get_multi`'s offset, paging by the last email seen costs the same on every page.
+        """
+        query = select(*SUMMARY_COLUMNS).order_by(User.email).limit(limit)
+        if after is not None:
+            query = query.where(User.email > after)
+        result = await db.execute(query)
+        return list(result.all())
+
+    def _filtered(
+        self,
+        *,
+        role: Optional[UserRole],
+        is_banned: Optional[bool],
+        created_from: Optional[datetime.datetime],
+        created_to: Optional[datetime.datetime],
+    ) -> Select:
+        query = select(*SUMMARY_COLUMNS)
+        if role is not None:
+            query = query.where(User.role == role)
+        if is_banned is not None:
+            query = query.where(User.is_banned == is_banned)
+        if created_from is not None:
+            query = query.where(User.created_at >= _local_time(created_from))
+        if created_to is not None:
+            query = query.where(User.created_at < _local_time(created_to))
+        return query
+
+    async def get_page(
+        self,
+        db: AsyncSession,
+        *,
+        role: Optional[UserRole] = None,
+        is_banned: Optional[bool] = None,
+        created_from: Optional[datetime.datetime] = None,
+        created_to: Optional[datetime.datetime] = None,
+        before: Optional[tuple[datetime.datetime, str]] = None,
+        limit: int,
+    ) -> List[Row]:
+        """
+        The `SUMMARY_COLUMNS` of up to `limit` users, newest first, that come after `before`,
+        the creation time and email of the last user of the previous page.
+        Every filter combination walks one of the `(…, created_at, email)` indexes from its position.
+        """
+        query = self._filtered(role=role, is_banned=is_banned, created_from=created_from, created_to=created_to)
+        if before is not None:
+            # Listed rather than passed inline, or mypy joins the element types of each tuple to `object`
+            key: list[ColumnElement[Any]] = [User.created_at, User.email]
+            position: list[ColumnElement[Any]] = [literal(before[0]), literal(before[1])]
+            query = query.where(tuple_(*key) < tuple_(*position))
+        query = query.order_by(User.created_at.desc(), User.email.desc()).limit(limit)
+        result = await db.execute(query)
+        return list(result.all())
+
+    async def estimate_total(
+        self,
+        db: AsyncSession,
+        *,
+        role: Optional[UserRole] = None,
+        is_banned: Optional[bool] = None,
+        created_from: Optional[datetime.datetime] = None,
+        created_to: Optional[datetime.datetime] = None,
+    ) -> int:
+        query = self._filtered(role=role, is_banned=is_banned, created_from=created_from, created_to=created_to)
+        return await estimate_count(db, query)
+
+    async def search(self, db: AsyncSession, *, term: str, limit: int) -> List[Row]:
+        """
+        The `SUMMARY_COLUMNS` and a `score` of up to `limit` users whose name or email contains `term`,
+        or is similar to it (pg_trgm's `%`), substring matches first and then by similarity.
+        Both conditions are answered by the trigram indexes, as long as `term` has at least 3 characters.
+        """
+        pattern = f"%{_escape_like(term)}%"
+        contains = or_(User.full_name.ilike(pattern, escape="/"), User.email.ilike(pattern, escape="/"))
+        similar = or_(User.full_name.op("%")(term), User.email.op("%")(term))
+        score = func.greatest(func.similarity(User.full_name, term), func.similarity(User.email, term))
+        query = (
+            select(*SUMMARY_COLUMNS, score.label("score"))
+            .where(or_(contains, similar))
+            .order_by(desc(contains.self_group()), desc("score"), User.email)
+            .limit(limit)
+        )
+        result = await db.execute(query)
+        return list(result.all())
+
     async def create_user(self, db: AsyncSession, *, obj_in: Union[UserCreate, UserForceCreate]) -> User:
         is_superuser: bool = False
         try:
@@ -30,15 +166,37 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         db_obj = User(
             role=role,
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await get_password_hash(obj_in.password),
             full_name=obj_in.full_name,
             is_superuser=is_superuser,
         )
         db.add(db_obj)
-        await db.commit()
-        await db.refresh(db_obj)
+        await db.flush()
         return db_obj
 
+    async def import_batch(self, db: AsyncSession, *, rows: Sequence[tuple[Any, ...]]) -> list[str]:
+        """
+        Writes rows of `IMPORT_COLUMNS` values with COPY into a temporary table, then moves the ones
+        whose email isn't taken into the user table. Returns the emails that were inserted.
+        The temporary table lives until the commit, so there can be one batch per transaction.
+        """
+        await db.execute(
+            text('CREATE TEMPORARY TABLE user_import (LIKE "user" INCLUDING DEFAULTS) ON COMMIT DROP')
+        )
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "user_import", records=rows, columns=IMPORT_COLUMNS
+        )
+        statement = (
+            insert(User)
+            .from_select(IMPORT_COLUMNS, select(_import_table))
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.email)
+        )
+        result = await db.execute(statement)
+        return list(result.scalars())
+
     async def update(
         self, db: AsyncSession, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> User:
@@ -48,7 +206,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             update_data = obj_in.dict(exclude_unset=True)
         password = update_data.pop("password", None)
         if password:
-            hashed_password = get_password_hash(password)
+            hashed_password = await get_password_hash(password)
             update_data["hashed_password"] = hashed_password
         return await super().update(db, db_obj=db_obj, obj_in=update_data)
 
@@ -56,8 +214,13 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         user = await self.get_by_email(db, email=email)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+        if not verified:
             return None
+        if new_hash:
+            user.hashed_password = new_hash
+            db.add(user)
+            await db.flush()
         return user
 
     def is_banned(self, user: User) -> bool:
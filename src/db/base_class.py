@@ -7,6 +7,8 @@ from sqlalchemy.ext.declarative import as_declarative, declared_attr
 class Base:
     id: Any
     __name__: str
+    # Fetch server-generated defaults with RETURNING on flush instead of a refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
 
     # Generate __tablename__ automatically
     @declared_attr
@@ -1,3 +1,4 @@
+from db.models.revoked_token import RevokedToken
 from db.models.user import Token, User
 
-__all__ = ["User", "Token"]
+__all__ = ["User", "Token", "RevokedToken"]
@@ -0,0 +1,11 @@
+import datetime
+
+from sqlalchemy import Column, DateTime, LargeBinary
+from sqlalchemy.orm import Mapped
+
+from db.base_class import Base
+
+
+class RevokedToken(Base):
+    access_token_hash: Mapped[bytes] = Column(LargeBinary(32), primary_key=True)
+    expires_at: Mapped[datetime.datetime] = Column(DateTime, index=True, nullable=False)
@@ -1,7 +1,19 @@
 import datetime
 import enum
+import uuid
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    String,
+    text,
+)
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, relationship
 
 from db.base_class import Base
@@ -23,20 +35,46 @@ class UserRole(enum.Enum):
 
 
 class User(Base):
+    __table_args__ = (
+        # Listing users newest first, unfiltered, by role, or banned only (few users are). Pages are read with
+        # a backward index scan that stops after the page; the listed columns come from the table, since
+        # covering them all would copy every name into these indexes for a page's worth of heap reads.
+        Index("ix_user_created_at_email", "created_at", "email"),
+        Index("ix_user_role_created_at_email", "role", "created_at", "email"),
+        Index("ix_user_banned_created_at_email", "created_at", "email", postgresql_where=text("is_banned")),
+        # Substring and similarity search
+        Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        Index("ix_user_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
+
     email: Mapped[str] = Column(String, unique=True, primary_key=True, index=True, nullable=False)
     full_name: Mapped[str] = Column(String, index=True)
     role: Mapped[UserRole] = Column(Enum(UserRole), default=UserRole.USER, nullable=False)
     hashed_password: Mapped[str] = Column(String, nullable=False)
     is_banned: Mapped[bool] = Column(Boolean(), default=False)
     is_superuser: Mapped[bool] = Column(Boolean(), default=False)
-    created_at: Mapped[datetime.datetime] = Column(DateTime, default=datetime.datetime.now(), nullable=False)
+    created_at: Mapped[datetime.datetime] = Column(DateTime, default=datetime.datetime.now, nullable=False)
 
-    token: Mapped["Token"] = relationship("Token", back_populates="user", uselist=False)
+    tokens: Mapped[list["Token"]] = relationship("Token", back_populates="user")
 
 
 class Token(Base):
-    email: Mapped[str] = Column(String, ForeignKey("user.email"), primary_key=True)
-    access_token: Mapped[str] = Column(String, index=True, nullable=False)
-    refresh_token: Mapped[str] = Column(String, index=True, nullable=False)
+    """
+    One row per session; a user may have several, one per device they logged in from.
+    """
+
+    __table_args__ = (Index("ix_token_email_created_at", "email", "created_at"),)
+
+    id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    email: Mapped[str] = Column(String, ForeignKey("user.email"), nullable=False)
+    access_token_hash: Mapped[bytes] = Column(LargeBinary(32), index=True, unique=True, nullable=False)
+    refresh_token_hash: Mapped[bytes] = Column(LargeBinary(32), nullable=False)
+    created_at: Mapped[datetime.datetime] = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    expires_at: Mapped[datetime.datetime] = Column(DateTime, index=True, nullable=False)
 
-    user: Mapped[User] = relationship("User", back_populates="token")
+    user: Mapped[User] = relationship("User", back_populates="tokens")
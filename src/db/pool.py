@@ -0,0 +1,56 @@
+import time
+from typing import Any, TypedDict
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from core.metrics import db_pool_checkout_duration
+
+
+class PoolStats(TypedDict):
+    size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that also records how long checkouts take, including waiting
+    for a free connection, pre-ping and opening new connections.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    # The stubs leave QueuePool's methods unannotated, hence the no-untyped-call ignores below
+    def connect(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super().connect()  # type: ignore[no-untyped-call]
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            db_pool_checkout_duration.observe(waited)
+
+    def stats(self) -> PoolStats:
+        return {
+            "size": self.size(),  # type: ignore[no-untyped-call]
+            # Only kept privately; QueuePool has no public accessor for it
+            "max_overflow": self._max_overflow,  # type: ignore[attr-defined]
+            "checked_out": self.checkedout(),  # type: ignore[no-untyped-call]
+            "idle": self.checkedin(),  # type: ignore[no-untyped-call]
+            # overflow() starts at -size and only turns positive once connections beyond size are open
+            "overflow": max(self.overflow(), 0),  # type: ignore[no-untyped-call]
+            "checkouts": self.checkouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
@@ -2,8 +2,28 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from core.config import app_settings
+from core.metrics import registry
+from db import tracing
+from db.pool import InstrumentedQueuePool, PoolStats
+
+engine_async = create_async_engine(
+    app_settings.SQLALCHEMY_DATABASE_URI_ASYNC,
+    poolclass=InstrumentedQueuePool,
+    pool_size=app_settings.DB_POOL_SIZE,
+    max_overflow=app_settings.DB_MAX_OVERFLOW,
+    pool_timeout=app_settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=app_settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=app_settings.DB_POOL_PRE_PING,
+    connect_args={
+        "statement_cache_size": app_settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": app_settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    },
+)
+tracing.QueryTracer(
+    slow_query_seconds=app_settings.SQL_SLOW_QUERY_MS / 1000 if app_settings.SQL_SLOW_QUERY_MS else None,
+    detect_repeats=app_settings.SQL_WARN_REPEATED_STATEMENTS,
+).install(engine_async.sync_engine)
 
-engine_async = create_async_engine(app_settings.SQLALCHEMY_DATABASE_URI_ASYNC, pool_pre_ping=True)
 async_session = sessionmaker(
     bind=engine_async,
     class_=AsyncSession,
@@ -11,3 +31,23 @@ async_session = sessionmaker(
     autoflush=False,
     expire_on_commit=False,
 )
+
+
+def pool_stats() -> PoolStats:
+    pool = engine_async.pool
+    assert isinstance(pool, InstrumentedQueuePool)
+    return pool.stats()
+
+
+def _pool_connections() -> dict[tuple[str, ...], float]:
+    stats = pool_stats()
+    return {("checked_out",): stats["checked_out"], ("idle",): stats["idle"], ("overflow",): stats["overflow"]}
+
+
+registry.callback("db_pool_connections", "Pooled connections by state", _pool_connections, ("state",))
+registry.callback("db_pool_size", "Connections the pool keeps open", lambda: pool_stats()["size"])
+registry.callback(
+    "db_pool_max_overflow",
+    "Connections the pool may open beyond its size",
+    lambda: pool_stats()["max_overflow"],
+)
@@ -0,0 +1,67 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+@dataclass
+class QueryStats:
+    route: str = ""
+    queries: int = 0
+    seconds: float = 0.0
+    # How often each statement ran with the same parameters, only filled when repeats are detected.
+    # Parameters are kept as a hash, so no digest or other value outlives the statement.
+    statements: Counter[tuple[str, int]] = field(default_factory=Counter)
+
+
+# Set per request by the metrics middleware; statements run outside a request aren't tracked
+query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+class QueryTracer:
+    """
+    Adds up the statements a request runs and their time, and logs slow statements with the request they ran in.
+    **Parameters**
+    * `slow_query_seconds`: Statements taking at least this long are logged, None disables it
+    * `detect_repeats`: Remember each statement with its parameters, so `report_repeats` can point out
+      identical statements a request ran more than once
+    """
+
+    def __init__(self, slow_query_seconds: Optional[float], detect_repeats: bool):
+        self.slow_query_seconds = slow_query_seconds
+        self.detect_repeats = detect_repeats
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(
+        self, conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+    ) -> None:
+        elapsed = time.perf_counter() - context._query_started
+        stats = query_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+            if self.detect_repeats:
+                stats.statements[(statement, hash(repr(parameters)))] += 1
+
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            route = stats.route if stats is not None else "no request"
+            logger.warning("Slow query ({:.1f} ms) in {}: {}", elapsed * 1000, route, statement)
+
+
+def report_repeats(stats: QueryStats) -> None:
+    for (statement, _), count in stats.statements.items():
+        if count > 1:
+            logger.warning("{} ran the same statement {} times: {}", stats.route, count, statement)
@@ -69,6 +69,18 @@ class SameEmailError(APIException):
     default_detail = "The user with this email already exists in the system."
 
 
+class InvalidCursor(APIException):
+    default_status_code = status.HTTP_400_BAD_REQUEST
+    default_code = "invalid_cursor"
+    default_detail = "The page cursor is invalid"
+
+
+class PasswordHashingUnavailable(APIException):
+    default_status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = "service_overloaded"
+    default_detail = "Too many login attempts are being processed. Please, try again later."
+
+
 class SomethingWentWrongException(APIException):
     default_status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
     default_code = "something_went_wrong"
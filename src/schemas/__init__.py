@@ -1,2 +1,2 @@
-from .token import Token, TokenPayload
+from .token import IntrospectionRequest, IntrospectionResponse, Token, TokenPayload
 from .user import User, UserCreate, UserInDB, UserUpdate
@@ -1,6 +1,10 @@
+import datetime
+import uuid
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, conlist
+
+from core.config import app_settings
 
 
 class Token(BaseModel):
@@ -9,15 +13,33 @@ class Token(BaseModel):
 
 
 class TokenCreate(BaseModel):
+    id: uuid.UUID
     email: EmailStr
-    access_token: str
-    refresh_token: str
+    access_token_hash: bytes
+    refresh_token_hash: bytes
+    expires_at: datetime.datetime
 
 
 class TokenUpdate(BaseModel):
-    access_token: str
-    refresh_token: str
+    access_token_hash: bytes
+    refresh_token_hash: bytes
+    expires_at: datetime.datetime
 
 
 class TokenPayload(BaseModel):
     sub: Optional[int] = None
+
+
+class IntrospectionRequest(BaseModel):
+    tokens: conlist(str, min_items=1, max_items=app_settings.INTROSPECTION_MAX_TOKENS)  # type: ignore
+
+
+class TokenIntrospection(BaseModel):
+    active: bool
+    user_id: Optional[str] = None
+    role: Optional[str] = None
+    exp: Optional[int] = None
+
+
+class IntrospectionResponse(BaseModel):
+    results: list[TokenIntrospection]
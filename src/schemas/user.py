@@ -1,6 +1,9 @@
-from typing import Optional
+import datetime
+import enum
+from typing import Any, Optional
 
-from pydantic import BaseModel, EmailStr
+from passlib.hash import bcrypt
+from pydantic import BaseModel, EmailStr, root_validator
 
 from db.models.user import UserRole
 
@@ -44,6 +47,24 @@ class User(UserInDBBase):
     pass
 
 
+class UserSummary(UserInDBBase):
+    is_banned: Optional[bool] = None
+    created_at: datetime.datetime
+
+
+class UserSearchResult(UserSummary):
+    # Trigram similarity to the search term, from 0 to 1, of the name or email, whichever is closer
+    score: float
+
+
+class UserPage(BaseModel):
+    items: list[UserSummary]
+    # Pass as `cursor` to get the next page; None on the last one
+    next_cursor: Optional[str] = None
+    # Estimated from table statistics, only when asked for
+    approximate_total: Optional[int] = None
+
+
 class UserProfile(BaseModel):
     email: EmailStr
     full_name: str
@@ -54,3 +75,48 @@ class UserProfile(BaseModel):
 
 class UserInDB(UserInDBBase):
     hashed_password: str
+
+
+class FileFormat(str, enum.Enum):
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
+class UserImportRow(BaseModel):
+    """
+    One user of a bulk import, with either a plain `password` or a bcrypt `hashed_password`.
+    """
+
+    email: EmailStr
+    full_name: str
+    role: UserRole = UserRole.USER
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_password(cls, values: dict[str, Any]) -> dict[str, Any]:
+        password, hashed_password = values.get("password"), values.get("hashed_password")
+        if bool(password) == bool(hashed_password):
+            raise ValueError("Exactly one of password and hashed_password is required")
+        if hashed_password:
+            try:
+                bcrypt.from_string(hashed_password)
+            except ValueError as e:
+                raise ValueError("hashed_password is not a bcrypt hash") from e
+        return values
+
+
+class UserImportError(BaseModel):
+    line: int
+    email: Optional[str] = None
+    error: str
+
+
+class UserImportReport(BaseModel):
+    rows: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    # Only the first errors are listed, the counts above cover all rows
+    errors: list[UserImportError] = []
+    seconds: float = 0.0
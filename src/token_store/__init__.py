@@ -0,0 +1,27 @@
+from core.config import app_settings
+from token_store.base import TokenStore
+from token_store.memory import InMemoryTokenStore
+from token_store.postgres import PostgresTokenStore
+
+
+def create_token_store() -> TokenStore:
+    ttl_seconds = app_settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    max_sessions = app_settings.MAX_SESSIONS_PER_USER
+
+    if app_settings.TOKEN_STORE_BACKEND == "redis":
+        from token_store.kv import RedisTokenStore
+
+        return RedisTokenStore.from_url(
+            app_settings.REDIS_URL,
+            ttl_seconds=ttl_seconds,
+            key_prefix=app_settings.REDIS_KEY_PREFIX,
+            max_sessions=max_sessions,
+        )
+    if app_settings.TOKEN_STORE_BACKEND == "memory":
+        return InMemoryTokenStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+    return PostgresTokenStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+
+
+token_store = create_token_store()
+
+__all__ = ["TokenStore", "token_store"]
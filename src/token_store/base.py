@@ -0,0 +1,83 @@
+import uuid
+from abc import ABC, abstractmethod
+from typing import Collection, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+from db.models.user import UserRole
+
+
+class TokenStore(ABC):
+    """
+    Where sessions live. Sessions are identified by the digests of their tokens, never the tokens themselves.
+    A user may hold up to `max_sessions` of them at once (0 means no limit), the oldest ones are ended first.
+    Every method takes the request's database session; backends that keep sessions elsewhere
+    only use it to read the session owner.
+    """
+
+    max_sessions: int
+
+    async def close(self) -> None:
+        pass
+
+    async def warm_up(self, db: AsyncSession, *, email: str) -> None:
+        """
+        Runs the backend's hot operations once on behalf of an existing user, in a transaction
+        the caller rolls back, so a new worker's first requests don't pay for connecting or preparing them.
+        """
+
+    @abstractmethod
+    async def save(
+        self,
+        db: AsyncSession,
+        *,
+        session_id: uuid.UUID,
+        email: str,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+    ) -> list[bytes]:
+        """
+        Starts a session for the user, ending their oldest ones if they are over the limit.
+        Returns the access token digests of the ended sessions.
+        """
+
+    @abstractmethod
+    async def rotate(
+        self,
+        db: AsyncSession,
+        *,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+        new_access_token_hash: bytes,
+        new_refresh_token_hash: bytes,
+    ) -> Optional[tuple[str, UserRole]]:
+        """
+        Atomically swaps the session's tokens if both current digests match and the owner isn't banned.
+        Returns the owner's email and current role, or None if nothing was swapped.
+        """
+
+    @abstractmethod
+    async def revoke(self, db: AsyncSession, *, access_token_hash: bytes, refresh_token_hash: bytes) -> bool:
+        """
+        Ends the session if both digests match. Returns whether a session was removed.
+        """
+
+    @abstractmethod
+    async def revoke_all(self, db: AsyncSession, *, email: str) -> list[bytes]:
+        """
+        Ends every session of the user. Returns their access token digests.
+        """
+
+    @abstractmethod
+    async def filter_active(self, db: AsyncSession, *, access_token_hashes: Collection[bytes]) -> set[bytes]:
+        """
+        Returns the subset of access token digests that still belong to a session.
+        """
+
+
+async def get_session_owner(db: AsyncSession, email: str) -> Optional[UserRole]:
+    user = await crud.user.get_by_email(db, email=email)
+    if not user or crud.user.is_banned(user):
+        return None
+    return user.role
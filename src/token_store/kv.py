@@ -0,0 +1,187 @@
+import time
+import uuid
+from types import ModuleType
+from typing import Any, Collection, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.user import UserRole
+from token_store.base import TokenStore, get_session_owner
+
+# redis is optional, only the Redis store needs it
+aioredis: Optional[ModuleType]
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+# Session values are the 64 hex chars of the refresh digest, the 32 hex chars of the session id and the email.
+# The user key is a sorted set of the hex access digests of the user's sessions scored by when they started.
+
+_SAVE = """
+local live = {}
+for _, digest in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    if redis.call('EXISTS', ARGV[4] .. digest) == 1 then
+        table.insert(live, digest)
+    else
+        redis.call('ZREM', KEYS[1], digest)
+    end
+end
+local evicted = {}
+local cap = tonumber(ARGV[5])
+if cap > 0 then
+    for i = 1, #live - cap + 1 do
+        redis.call('DEL', ARGV[4] .. live[i])
+        redis.call('ZREM', KEYS[1], live[i])
+        table.insert(evicted, live[i])
+    end
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[1], ARGV[6], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return evicted
+"""
+
+_ROTATE = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+local started = redis.call('ZSCORE', KEYS[3], ARGV[4]) or ARGV[6]
+redis.call('ZREM', KEYS[3], ARGV[4])
+redis.call('ZADD', KEYS[3], started, ARGV[5])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return 1
+"""
+
+_REVOKE = """
+local value = redis.call('GET', KEYS[1])
+if not value or string.sub(value, 1, 64) ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', ARGV[3] .. string.sub(value, 97), ARGV[2])
+return 1
+"""
+
+_REVOKE_ALL = """
+local revoked = {}
+for _, digest in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    if redis.call('DEL', ARGV[1] .. digest) == 1 then table.insert(revoked, digest) end
+end
+redis.call('DEL', KEYS[1])
+return revoked
+"""
+
+
+class RedisTokenStore(TokenStore):
+    """
+    Sessions in Redis (or anything speaking its protocol) with a TTL of the refresh token lifetime,
+    so expired sessions disappear without touching Postgres.
+    Multi-key updates run as Lua scripts, which keeps them atomic but requires a single shard.
+    """
+
+    def __init__(self, client: Any, *, ttl_seconds: int, key_prefix: str, max_sessions: int):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.session_prefix = f"{key_prefix}session:"
+        self.user_prefix = f"{key_prefix}sessions:"
+        self._save = client.register_script(_SAVE)
+        self._rotate = client.register_script(_ROTATE)
+        self._revoke = client.register_script(_REVOKE)
+        self._revoke_all = client.register_script(_REVOKE_ALL)
+
+    @classmethod
+    def from_url(cls, url: str, *, ttl_seconds: int, key_prefix: str, max_sessions: int) -> "RedisTokenStore":
+        if aioredis is None:
+            raise RuntimeError("The redis token store requires the redis package to be installed")
+        return cls(
+            aioredis.from_url(url), ttl_seconds=ttl_seconds, key_prefix=key_prefix, max_sessions=max_sessions
+        )
+
+    def _session_key(self, access_token_hash: bytes) -> str:
+        return self.session_prefix + access_token_hash.hex()
+
+    def _user_key(self, email: str) -> str:
+        return self.user_prefix + email
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    async def warm_up(self, db: AsyncSession, *, email: str) -> None:
+        # Loaded scripts run by their digest right away instead of after a NOSCRIPT reply
+        for script in (self._save, self._rotate, self._revoke, self._revoke_all):
+            await self.client.script_load(script.script)
+
+    async def save(
+        self,
+        db: AsyncSession,
+        *,
+        session_id: uuid.UUID,
+        email: str,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+    ) -> list[bytes]:
+        evicted = await self._save(
+            keys=[self._user_key(email), self._session_key(access_token_hash)],
+            args=[
+                access_token_hash.hex(),
+                refresh_token_hash.hex() + session_id.hex + email,
+                self.ttl_seconds,
+                self.session_prefix,
+                self.max_sessions,
+                time.time(),
+            ],
+        )
+        return [bytes.fromhex(digest.decode()) for digest in evicted]
+
+    async def rotate(
+        self,
+        db: AsyncSession,
+        *,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+        new_access_token_hash: bytes,
+        new_refresh_token_hash: bytes,
+    ) -> Optional[tuple[str, UserRole]]:
+        current = await self.client.get(self._session_key(access_token_hash))
+        if current is None or current[:64] != refresh_token_hash.hex().encode():
+            return None
+
+        email = current[96:].decode()
+        role = await get_session_owner(db, email)
+        if role is None:
+            return None
+
+        swapped = await self._rotate(
+            keys=[
+                self._session_key(access_token_hash),
+                self._session_key(new_access_token_hash),
+                self._user_key(email),
+            ],
+            args=[
+                current,
+                new_refresh_token_hash.hex().encode() + current[64:],
+                self.ttl_seconds,
+                access_token_hash.hex(),
+                new_access_token_hash.hex(),
+                time.time(),
+            ],
+        )
+        return (email, role) if swapped else None
+
+    async def revoke(self, db: AsyncSession, *, access_token_hash: bytes, refresh_token_hash: bytes) -> bool:
+        revoked = await self._revoke(
+            keys=[self._session_key(access_token_hash)],
+            args=[refresh_token_hash.hex(), access_token_hash.hex(), self.user_prefix],
+        )
+        return bool(revoked)
+
+    async def revoke_all(self, db: AsyncSession, *, email: str) -> list[bytes]:
+        revoked = await self._revoke_all(keys=[self._user_key(email)], args=[self.session_prefix])
+        return [bytes.fromhex(digest.decode()) for digest in revoked]
+
+    async def filter_active(self, db: AsyncSession, *, access_token_hashes: Collection[bytes]) -> set[bytes]:
+        digests = list(access_token_hashes)
+        if not digests:
+            return set()
+        values = await self.client.mget([self._session_key(digest) for digest in digests])
+        return {digest for digest, value in zip(digests, values) if value is not None}
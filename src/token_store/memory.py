@@ -0,0 +1,115 @@
+import hmac
+import time
+import uuid
+from typing import Collection, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models.user import UserRole
+from token_store.base import TokenStore, get_session_owner
+
+
+class InMemoryTokenStore(TokenStore):
+    """
+    Sessions in a dict of the current process, expiring with the refresh token.
+    Only suitable for a single worker, e.g. tests and local development.
+    """
+
+    def __init__(self, *, ttl_seconds: int, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: dict[bytes, tuple[uuid.UUID, str, bytes, float]] = {}
+        # Access token digest of each of the user's sessions, oldest session first
+        self._by_email: dict[str, dict[uuid.UUID, bytes]] = {}
+
+    def _get(self, access_token_hash: bytes) -> Optional[tuple[uuid.UUID, str, bytes, float]]:
+        session = self._sessions.get(access_token_hash)
+        if session is not None and session[3] <= time.monotonic():
+            self._drop(access_token_hash)
+            return None
+        return session
+
+    def _drop(self, access_token_hash: bytes) -> None:
+        session = self._sessions.pop(access_token_hash, None)
+        if session is None:
+            return
+        session_id, email = session[0], session[1]
+        user_sessions = self._by_email.get(email, {})
+        user_sessions.pop(session_id, None)
+        if not user_sessions:
+            self._by_email.pop(email, None)
+
+    def _put(
+        self, session_id: uuid.UUID, email: str, access_token_hash: bytes, refresh_token_hash: bytes
+    ) -> None:
+        self._sessions[access_token_hash] = (
+            session_id,
+            email,
+            refresh_token_hash,
+            time.monotonic() + self.ttl_seconds,
+        )
+        # Replacing the digest of an existing session keeps its place in the age order
+        self._by_email.setdefault(email, {})[session_id] = access_token_hash
+
+    def _live_sessions(self, email: str) -> list[bytes]:
+        return [
+            digest for digest in list(self._by_email.get(email, {}).values()) if self._get(digest) is not None
+        ]
+
+    async def save(
+        self,
+        db: AsyncSession,
+        *,
+        session_id: uuid.UUID,
+        email: str,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+    ) -> list[bytes]:
+        evicted = []
+        if self.max_sessions > 0:
+            live = self._live_sessions(email)
+            evicted = live[: max(len(live) - self.max_sessions + 1, 0)]
+            for digest in evicted:
+                self._drop(digest)
+        self._put(session_id, email, access_token_hash, refresh_token_hash)
+        return evicted
+
+    async def rotate(
+        self,
+        db: AsyncSession,
+        *,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+        new_access_token_hash: bytes,
+        new_refresh_token_hash: bytes,
+    ) -> Optional[tuple[str, UserRole]]:
+        session = self._get(access_token_hash)
+        if session is None or not hmac.compare_digest(session[2], refresh_token_hash):
+            return None
+
+        session_id, email = session[0], session[1]
+        role = await get_session_owner(db, email)
+        # The owner lookup yields to the event loop, so the session may have been rotated meanwhile
+        if role is None or self._get(access_token_hash) != session:
+            return None
+
+        del self._sessions[access_token_hash]
+        self._put(session_id, email, new_access_token_hash, new_refresh_token_hash)
+        return email, role
+
+    async def revoke(self, db: AsyncSession, *, access_token_hash: bytes, refresh_token_hash: bytes) -> bool:
+        session = self._get(access_token_hash)
+        if session is None or not hmac.compare_digest(session[2], refresh_token_hash):
+            return False
+        self._drop(access_token_hash)
+        return True
+
+    async def revoke_all(self, db: AsyncSession, *, email: str) -> list[bytes]:
+        revoked = self._live_sessions(email)
+        for digest in revoked:
+            self._drop(digest)
+        self._by_email.pop(email, None)
+        return revoked
+
+    async def filter_active(self, db: AsyncSession, *, access_token_hashes: Collection[bytes]) -> set[bytes]:
+        return {digest for digest in access_token_hashes if self._get(digest) is not None}
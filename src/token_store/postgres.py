@@ -0,0 +1,105 @@
+import datetime
+import os
+import uuid
+from typing import Collection, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+from db.models.user import UserRole
+from schemas.token import TokenCreate, TokenUpdate
+from token_store.base import TokenStore
+
+# Offset of the eviction when warming up, past as many sessions as any user can have
+_UNREACHABLE_MAX_SESSIONS = 2**31 - 1
+
+
+class PostgresTokenStore(TokenStore):
+    """
+    Sessions in the `token` table, one row each, written in the request's transaction.
+    """
+
+    def __init__(self, *, ttl_seconds: int, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+
+    def _expires_at(self) -> datetime.datetime:
+        return datetime.datetime.utcnow() + datetime.timedelta(seconds=self.ttl_seconds)
+
+    def _token(
+        self, session_id: uuid.UUID, email: str, access_token_hash: bytes, refresh_token_hash: bytes
+    ) -> TokenCreate:
+        return TokenCreate(
+            id=session_id,
+            email=email,
+            access_token_hash=access_token_hash,
+            refresh_token_hash=refresh_token_hash,
+            expires_at=self._expires_at(),
+        )
+
+    async def warm_up(self, db: AsyncSession, *, email: str) -> None:
+        # Random digests match no session. The one saved here is revoked again, and its cap is out of reach,
+        # so the eviction has the same SQL as on login but ends none of the user's sessions.
+        access_token_hash, refresh_token_hash = os.urandom(32), os.urandom(32)
+        await crud.token.create_capped(
+            db,
+            obj_in=self._token(uuid.uuid4(), email, access_token_hash, refresh_token_hash),
+            max_sessions=_UNREACHABLE_MAX_SESSIONS if self.max_sessions > 0 else 0,
+        )
+        await self.rotate(
+            db,
+            access_token_hash=os.urandom(32),
+            refresh_token_hash=os.urandom(32),
+            new_access_token_hash=os.urandom(32),
+            new_refresh_token_hash=os.urandom(32),
+        )
+        await self.revoke(db, access_token_hash=access_token_hash, refresh_token_hash=refresh_token_hash)
+
+    async def save(
+        self,
+        db: AsyncSession,
+        *,
+        session_id: uuid.UUID,
+        email: str,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+    ) -> list[bytes]:
+        return await crud.token.create_capped(
+            db,
+            obj_in=self._token(session_id, email, access_token_hash, refresh_token_hash),
+            max_sessions=self.max_sessions,
+        )
+
+    async def rotate(
+        self,
+        db: AsyncSession,
+        *,
+        access_token_hash: bytes,
+        refresh_token_hash: bytes,
+        new_access_token_hash: bytes,
+        new_refresh_token_hash: bytes,
+    ) -> Optional[tuple[str, UserRole]]:
+        return await crud.token.rotate(
+            db,
+            access_token_hash=access_token_hash,
+            refresh_token_hash=refresh_token_hash,
+            obj_in=TokenUpdate(
+                access_token_hash=new_access_token_hash,
+                refresh_token_hash=new_refresh_token_hash,
+                expires_at=self._expires_at(),
+            ),
+        )
+
+    async def revoke(self, db: AsyncSession, *, access_token_hash: bytes, refresh_token_hash: bytes) -> bool:
+        email = await crud.token.remove_by_hashes(
+            db, access_token_hash=access_token_hash, refresh_token_hash=refresh_token_hash
+        )
+        return email is not None
+
+    async def revoke_all(self, db: AsyncSession, *, email: str) -> list[bytes]:
+        return await crud.token.remove_by_email(db, email=email)
+
+    async def filter_active(self, db: AsyncSession, *, access_token_hashes: Collection[bytes]) -> set[bytes]:
+        if not access_token_hashes:
+            return set()
+        return await crud.token.get_existing_access_token_hashes(db, access_token_hashes=access_token_hashes)
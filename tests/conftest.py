@@ -0,0 +1,14 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings are read when the app's modules are imported; the tests don't connect to anything
+os.environ.setdefault("SECRET_KEY", "test-secret-key-of-at-least-32-bytes")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_USER", "postgres")
+os.environ.setdefault("POSTGRES_PASSWORD", "postgres")
+os.environ.setdefault("POSTGRES_DB", "auth")
+os.environ.setdefault("SUPERUSER_EMAIL", "admin@example.com")
+os.environ.setdefault("SUPERUSER_PASS", "admin")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
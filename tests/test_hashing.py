@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+import pytest
+
+from core.hashing import PasswordHasher
+from exceptions import PasswordHashingUnavailable
+
+
+def _hasher(workers: int = 1, queue_size: int = 1, timeout: float = 5.0) -> PasswordHasher:
+    hasher = PasswordHasher(["bcrypt"], target_ms=None, workers=workers, queue_size=queue_size, timeout=timeout)
+    # Threads stand in for the worker processes, the queue accounting is the same
+    hasher._executor = ThreadPoolExecutor(workers)  # type: ignore[assignment]
+    return hasher
+
+
+def _blocking(release: threading.Event) -> Callable[[], str]:
+    def _job() -> str:
+        release.wait(5)
+        return "done"
+
+    return _job
+
+
+async def _drained(hasher: PasswordHasher) -> None:
+    async def wait() -> None:
+        while hasher.pending:
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(wait(), 5)
+
+
+def _run(scenario: Callable[[], Awaitable[None]]) -> None:
+    asyncio.run(scenario())
+
+
+def test_calls_beyond_capacity_are_rejected() -> None:
+    async def scenario() -> None:
+        hasher, release = _hasher(workers=1, queue_size=1), threading.Event()
+        job = _blocking(release)
+        accepted = [asyncio.create_task(hasher._run(job)) for _ in range(hasher.capacity)]
+        await asyncio.sleep(0)
+        assert hasher.pending == 2
+
+        with pytest.raises(PasswordHashingUnavailable):
+            await hasher._run(job)
+        with pytest.raises(PasswordHashingUnavailable):
+            await hasher._run(job, weight=2)
+
+        release.set()
+        assert await asyncio.gather(*accepted) == ["done", "done"]
+        await _drained(hasher)
+        assert await hasher._run(job) == "done"
+
+    _run(scenario)
+
+
+def test_weighted_call_takes_several_places() -> None:
+    async def scenario() -> None:
+        hasher, release = _hasher(workers=1, queue_size=2), threading.Event()
+        job = _blocking(release)
+        batch = asyncio.create_task(hasher._run(job, weight=2))
+        await asyncio.sleep(0)
+        assert hasher.pending == 2
+        with pytest.raises(PasswordHashingUnavailable):
+            await hasher._run(job, weight=2)
+
+        release.set()
+        await batch
+        await _drained(hasher)
+
+    _run(scenario)
+
+
+def test_timed_out_call_keeps_its_place_until_the_job_ends() -> None:
+    async def scenario() -> None:
+        hasher, release = _hasher(workers=1, queue_size=0, timeout=0.05), threading.Event()
+        job = _blocking(release)
+        with pytest.raises(PasswordHashingUnavailable):
+            await hasher._run(job)
+
+        # The worker is still busy with the abandoned job
+        assert hasher.pending == 1
+        with pytest.raises(PasswordHashingUnavailable):
+            await hasher._run(job)
+
+        release.set()
+        await _drained(hasher)
+        assert await hasher._run(lambda: "next") == "next"
+
+    _run(scenario)
+
+
+def test_failed_job_frees_its_place() -> None:
+    def fail() -> None:
+        raise ValueError("boom")
+
+    async def scenario() -> None:
+        hasher = _hasher()
+        with pytest.raises(ValueError):
+            await hasher._run(fail)
+        await _drained(hasher)
+
+    _run(scenario)
+
+
+def test_places_are_taken_while_the_pool_starts(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def scenario() -> None:
+        hasher = PasswordHasher(["bcrypt"], target_ms=None, workers=1, queue_size=1, timeout=5.0)
+        started = asyncio.Event()
+
+        async def start() -> None:
+            await started.wait()
+            if hasher._executor is None:
+                hasher._executor = ThreadPoolExecutor(1)  # type: ignore[assignment]
+
+        monkeypatch.setattr(hasher, "start", start)
+        calls = [asyncio.create_task(hasher._run(lambda: "done")) for _ in range(hasher.capacity + 1)]
+        await asyncio.sleep(0)
+        started.set()
+
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        assert results.count("done") == hasher.capacity
+        assert sum(isinstance(result, PasswordHashingUnavailable) for result in results) == 1
+        await _drained(hasher)
+
+    _run(scenario)
+
+
+def test_failed_start_frees_the_places(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def scenario() -> None:
+        hasher = PasswordHasher(["bcrypt"], target_ms=None, workers=1, queue_size=0, timeout=5.0)
+
+        async def start() -> None:
+            raise OSError("no workers")
+
+        monkeypatch.setattr(hasher, "start", start)
+        with pytest.raises(OSError):
+            await hasher._run(lambda: "done")
+        assert hasher.pending == 0
+
+    _run(scenario)
@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import hmac
+import time
+from pathlib import Path
+
+import jwt
+import orjson
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from core.jwt_codec import JWTCodec, b64encode
+from core.keys import KeyRing
+
+SECRET = "jwt-codec-test-secret-" + "x" * 48
+CLAIMS = {"sub": "user@example.com", "role": "U", "exp": int(time.time()) + 600}
+
+
+@pytest.fixture
+def codec() -> JWTCodec:
+    return JWTCodec(KeyRing(SECRET, []))
+
+
+@pytest.fixture
+def rsa_key_path(tmp_path: Path) -> str:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    path = tmp_path / "signing.pem"
+    path.write_bytes(
+        private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+    )
+    return str(path)
+
+
+def _sign_hs256(header: dict, payload: bytes) -> str:
+    signing_input = b64encode(orjson.dumps(header)) + b"." + b64encode(payload)
+    signature = hmac.new(SECRET.encode(), signing_input, hashlib.sha256).digest()
+    return (signing_input + b"." + b64encode(signature)).decode()
+
+
+def test_encoded_tokens_verify_with_pyjwt(codec: JWTCodec) -> None:
+    token = codec.encode(CLAIMS)
+    assert jwt.decode(token, SECRET, algorithms=["HS256"]) == CLAIMS
+
+
+def test_pyjwt_tokens_decode(codec: JWTCodec) -> None:
+    token = jwt.encode(CLAIMS, SECRET, algorithm="HS256")
+    assert codec.decode(token) == CLAIMS
+
+
+def test_round_trip(codec: JWTCodec) -> None:
+    assert codec.decode(codec.encode(CLAIMS)) == CLAIMS
+
+
+def test_tampered_payload_is_rejected(codec: JWTCodec) -> None:
+    header, _, signature = codec.encode(CLAIMS).split(".")
+    forged = b64encode(orjson.dumps({**CLAIMS, "role": "SU"})).decode()
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(f"{header}.{forged}.{signature}")
+
+
+def test_tampered_signature_is_rejected(codec: JWTCodec) -> None:
+    token = codec.encode(CLAIMS)
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(token[:-4] + ("AAAA" if token[-4:] != "AAAA" else "BBBB"))
+
+
+def test_non_canonical_signature_is_rejected(codec: JWTCodec) -> None:
+    # The last character of a 32-byte signature carries 2 padding bits; setting them decodes to the same bytes
+    token = codec.encode(CLAIMS)
+    signing_input, _, signature = token.rpartition(".")
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    last = alphabet[alphabet.index(signature[-1]) | 1]
+    if last == signature[-1]:
+        last = alphabet[alphabet.index(signature[-1]) & ~1]
+    assert base64.urlsafe_b64decode(signature + "=") == base64.urlsafe_b64decode(signature[:-1] + last + "=")
+    with pytest.raises(jwt.InvalidSignatureError):
+        codec.decode(f"{signing_input}.{signature[:-1]}{last}")
+
+
+def test_expired_token_is_rejected(codec: JWTCodec) -> None:
+    token = codec.encode({**CLAIMS, "exp": int(time.time()) - 1})
+    with pytest.raises(jwt.ExpiredSignatureError):
+        codec.decode(token)
+
+
+def test_expired_token_decodes_without_verify_exp(codec: JWTCodec) -> None:
+    claims = {**CLAIMS, "exp": int(time.time()) - 1}
+    assert codec.decode(codec.encode(claims), verify_exp=False) == claims
+
+
+def test_non_integer_exp_is_rejected(codec: JWTCodec) -> None:
+    with pytest.raises(jwt.DecodeError):
+        codec.decode(codec.encode({**CLAIMS, "exp": "never"}))
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "",
+        "not-a-token",
+        "a.b.c",
+        _sign_hs256({"alg": "HS256", "typ": "JWT"}, b"not json"),
+        _sign_hs256({"alg": "HS256", "typ": "JWT"}, b"[1, 2]"),
+    ],
+)
+def test_malformed_token_is_rejected(codec: JWTCodec, token: str) -> None:
+    with pytest.raises(jwt.DecodeError):
+        codec.decode(token)
+
+
+def test_other_hmac_algorithm_is_rejected(codec: JWTCodec) -> None:
+    token = jwt.encode(CLAIMS, SECRET, algorithm="HS512")
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        codec.decode(token)
+
+
+def test_unsigned_token_is_rejected(codec: JWTCodec) -> None:
+    token = jwt.encode(CLAIMS, None, algorithm="none")
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        codec.decode(token)
+
+
+def test_unknown_kid_is_rejected(codec: JWTCodec) -> None:
+    token = jwt.encode(CLAIMS, SECRET, algorithm="HS256", headers={"kid": "unknown"})
+    with pytest.raises(jwt.InvalidKeyError):
+        codec.decode(token)
+
+
+def test_rsa_tokens_round_trip_with_pyjwt(rsa_key_path: str) -> None:
+    keys = KeyRing(SECRET, [rsa_key_path])
+    codec = JWTCodec(keys)
+
+    token = codec.encode(CLAIMS)
+    assert jwt.get_unverified_header(token)["kid"] == keys.signing_key.kid
+    assert jwt.decode(token, keys.signing_key.public_key, algorithms=["RS256"]) == CLAIMS
+    assert codec.decode(token) == CLAIMS
+
+    token = jwt.encode(
+        CLAIMS, keys.signing_key.private_key, algorithm="RS256", headers={"kid": keys.signing_key.kid}
+    )
+    assert codec.decode(token) == CLAIMS
+
+
+def test_hmac_tokens_are_rejected_after_switching_to_rsa(codec: JWTCodec, rsa_key_path: str) -> None:
+    token = codec.encode(CLAIMS)
+    with pytest.raises(jwt.InvalidKeyError):
+        JWTCodec(KeyRing(SECRET, [rsa_key_path])).decode(token)
+
+
+def test_hmac_tokens_verify_after_switching_to_rsa_while_accepted(codec: JWTCodec, rsa_key_path: str) -> None:
+    token = codec.encode(CLAIMS)
+    assert JWTCodec(KeyRing(SECRET, [rsa_key_path], accept_hmac=True)).decode(token) == CLAIMS
+
+
+def test_public_key_used_as_hmac_secret_is_rejected(rsa_key_path: str) -> None:
+    keys = KeyRing(SECRET, [rsa_key_path])
+    public_pem = keys.signing_key.public_key.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    header = {"alg": "HS256", "kid": keys.signing_key.kid, "typ": "JWT"}
+    signing_input = b64encode(orjson.dumps(header)) + b"." + b64encode(orjson.dumps(CLAIMS))
+    signature = hmac.new(public_pem, signing_input, hashlib.sha256).digest()
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        JWTCodec(keys).decode((signing_input + b"." + b64encode(signature)).decode())
@@ -0,0 +1,109 @@
+import asyncio
+from typing import Optional
+
+import pytest
+
+from core.config import app_settings
+from core.dependencies import metrics_scraper
+from core.metrics import Counter, Histogram, Metric, Registry
+from exceptions import KudaPoperError
+
+
+@pytest.fixture
+def registry() -> Registry:
+    return Registry()
+
+
+def test_metric_must_render() -> None:
+    with pytest.raises(TypeError):
+        Metric("incomplete_total", "A metric that can't render")  # type: ignore[abstract]
+
+
+def test_counter(registry: Registry) -> None:
+    counter = registry.counter("logins_total", "Login attempts by outcome", ("outcome",))
+    counter.inc("success")
+    counter.inc("success", amount=2)
+    counter.inc("wrong_password", amount=0.5)
+
+    assert counter.value("success") == 3
+    assert counter.value("banned") == 0
+    assert counter.render() == [
+        "# HELP logins_total Login attempts by outcome",
+        "# TYPE logins_total counter",
+        'logins_total{outcome="success"} 3',
+        'logins_total{outcome="wrong_password"} 0.5',
+    ]
+
+
+def test_label_values_are_escaped(registry: Registry) -> None:
+    counter = registry.counter("errors_total", "Errors", ("message",))
+    counter.inc('say "hi"\\\n')
+    assert counter.render()[-1] == 'errors_total{message="say \\"hi\\"\\\\\\n"} 1'
+
+
+def test_histogram_buckets_are_cumulative(registry: Registry) -> None:
+    histogram = registry.histogram("request_seconds", "Request time", ("route",), buckets=(0.5, 0.1))
+    for value in (0.05, 0.1, 0.3, 2.0):
+        histogram.observe(value, "/login")
+
+    assert histogram.count("/login") == 4
+    assert histogram.count("/refresh") == 0
+    assert histogram.render() == [
+        "# HELP request_seconds Request time",
+        "# TYPE request_seconds histogram",
+        'request_seconds_bucket{route="/login",le="0.1"} 2',
+        'request_seconds_bucket{route="/login",le="0.5"} 3',
+        'request_seconds_bucket{route="/login",le="+Inf"} 4',
+        'request_seconds_sum{route="/login"} 2.45',
+        'request_seconds_count{route="/login"} 4',
+    ]
+
+
+def test_callback_metric_reads_its_value_when_rendered(registry: Registry) -> None:
+    pending = [1]
+    registry.callback("pending", "Calls in flight", lambda: pending[0])
+    registry.callback(
+        "rows_total", "Rows by table", lambda: {("token",): 2, ("user",): 3}, ("table",), "counter"
+    )
+    pending[0] = 7
+
+    assert registry.render() == (
+        "# HELP pending Calls in flight\n"
+        "# TYPE pending gauge\n"
+        "pending 7\n"
+        "# HELP rows_total Rows by table\n"
+        "# TYPE rows_total counter\n"
+        'rows_total{table="token"} 2\n'
+        'rows_total{table="user"} 3\n'
+    )
+
+
+def test_metric_names_are_unique(registry: Registry) -> None:
+    registry.counter("logins_total", "Login attempts")
+    with pytest.raises(ValueError):
+        registry.register(Counter("logins_total", "Login attempts again"))
+    with pytest.raises(ValueError):
+        registry.register(Histogram("logins_total", "Login time"))
+
+
+@pytest.mark.parametrize(
+    "configured, authorization, allowed",
+    [
+        ("scrape-key", "Bearer scrape-key", True),
+        ("scrape-key", "bearer scrape-key", True),
+        ("scrape-key", "Bearer other-key", False),
+        ("scrape-key", "Basic scrape-key", False),
+        ("scrape-key", "", False),
+        (None, "Bearer ", False),
+        (None, "", False),
+    ],
+)
+def test_metrics_need_the_scrape_key(
+    monkeypatch: pytest.MonkeyPatch, configured: Optional[str], authorization: str, allowed: bool
+) -> None:
+    monkeypatch.setattr(app_settings, "METRICS_API_KEY", configured)
+    if allowed:
+        asyncio.run(metrics_scraper(authorization))
+    else:
+        with pytest.raises(KudaPoperError):
+            asyncio.run(metrics_scraper(authorization))
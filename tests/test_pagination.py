@@ -0,0 +1,46 @@
+import datetime
+
+import orjson
+import pytest
+
+from core.jwt_codec import b64encode
+from core.pagination import decode_cursor, encode_cursor
+from exceptions import InvalidCursor
+
+
+def _cursor(value: object) -> str:
+    return b64encode(orjson.dumps(value)).decode()
+
+
+@pytest.mark.parametrize(
+    "created_at, email",
+    [
+        (datetime.datetime(2026, 1, 2, 3, 4, 5, 678901), "user@example.com"),
+        (datetime.datetime(2026, 1, 2), "ünïcode+tag@example.com"),
+    ],
+)
+def test_round_trip(created_at: datetime.datetime, email: str) -> None:
+    assert decode_cursor(encode_cursor(created_at, email)) == (created_at, email)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not base64!",
+        b64encode(b"not json").decode(),
+        _cursor({"created_at": "2026-01-02T00:00:00", "email": "user@example.com"}),
+        _cursor(["2026-01-02T00:00:00"]),
+        _cursor(["yesterday", "user@example.com"]),
+        _cursor([20260102, "user@example.com"]),
+    ],
+)
+def test_malformed_cursor_is_rejected(cursor: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("created_at", ["2026-01-02T00:00:00+00:00", "2026-01-02T00:00:00+05:30"])
+def test_cursor_with_time_zone_is_rejected(created_at: str) -> None:
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_cursor([created_at, "user@example.com"]))
@@ -0,0 +1,102 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from typing import Any, Optional
+
+import pytest
+from starlette.requests import Request
+
+import crud
+from api.v1 import auth_service as auth_service_module
+from api.v1.auth_service import AuthService
+from core import security
+from db.models.user import UserRole
+from exceptions import InvalidRefreshToken
+from schemas.token import Token
+from token_store import memory
+from token_store.memory import InMemoryTokenStore
+
+EMAIL = "user@example.com"
+DB: Any = None
+
+
+@pytest.fixture
+def revoked(monkeypatch: pytest.MonkeyPatch) -> list[bytes]:
+    """
+    Access token digests the refresh revoked, with an in-memory store standing in for the database.
+    """
+    revoked_digests: list[bytes] = []
+
+    async def get_session_owner(db: Any, email: str) -> Optional[UserRole]:
+        return UserRole.USER
+
+    async def revoke_many(db: Any, *, access_token_hashes: Any, expires_at: Any) -> None:
+        revoked_digests.extend(access_token_hashes)
+
+    monkeypatch.setattr(memory, "get_session_owner", get_session_owner)
+    monkeypatch.setattr(crud.revoked_token, "revoke_many", revoke_many)
+    monkeypatch.setattr(auth_service_module, "token_store", InMemoryTokenStore(ttl_seconds=60, max_sessions=0))
+    return revoked_digests
+
+
+def _request(tokens: Token) -> Request:
+    cookie = f"jwt-access={tokens.access_token}; jwt-refresh={tokens.refresh_token}"
+    return Request({"type": "http", "headers": [(b"cookie", cookie.encode())]})
+
+
+async def _login(expires_delta: timedelta = timedelta(minutes=5)) -> Token:
+    session_id = uuid.uuid4()
+    tokens = Token(
+        access_token=security.create_access_token(
+            EMAIL, UserRole.USER, str(session_id), expires_delta=expires_delta
+        ),
+        refresh_token=security.create_refresh_token(EMAIL, str(session_id)),
+    )
+    await auth_service_module.token_store.save(
+        DB,
+        session_id=session_id,
+        email=EMAIL,
+        access_token_hash=security.token_digest(tokens.access_token),
+        refresh_token_hash=security.token_digest(tokens.refresh_token),
+    )
+    return tokens
+
+
+def test_refresh_revokes_the_old_access_token(revoked: list[bytes]) -> None:
+    async def scenario() -> None:
+        service = AuthService()
+        tokens = await _login()
+        refreshed = await service.refresh_tokens(DB, _request(tokens))
+
+        assert refreshed.access_token != tokens.access_token
+        assert revoked == [security.token_digest(tokens.access_token)]
+        # The refreshed tokens are the session's current ones, the old ones are spent
+        with pytest.raises(InvalidRefreshToken):
+            await service.refresh_tokens(DB, _request(tokens))
+        await service.refresh_tokens(DB, _request(refreshed))
+
+    asyncio.run(scenario())
+
+
+def test_expired_access_token_is_not_revoked(revoked: list[bytes]) -> None:
+    async def scenario() -> None:
+        service = AuthService()
+        tokens = await _login(expires_delta=timedelta(minutes=-1))
+        await service.refresh_tokens(DB, _request(tokens))
+        assert revoked == []
+
+    asyncio.run(scenario())
+
+
+def test_rejected_refresh_revokes_nothing(revoked: list[bytes]) -> None:
+    async def scenario() -> None:
+        service = AuthService()
+        tokens = await _login()
+        stale = Token(
+            access_token=tokens.access_token, refresh_token=security.create_refresh_token(EMAIL, "other")
+        )
+        with pytest.raises(InvalidRefreshToken):
+            await service.refresh_tokens(DB, _request(stale))
+        assert revoked == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,60 @@
+import os
+import time
+
+import pytest
+
+from core.revocation import RevocationList, RevocationListener, _listener_dsn
+
+
+@pytest.fixture
+def revoked() -> RevocationList:
+    return RevocationList()
+
+
+def test_add_keeps_only_unexpired_tokens(revoked: RevocationList) -> None:
+    active, expired = os.urandom(32), os.urandom(32)
+    revoked.add(active, time.time() + 60)
+    revoked.add(expired, time.time() - 1)
+    assert active in revoked
+    assert expired not in revoked
+    assert len(revoked) == 1
+
+
+def test_replace_drops_previous_and_expired_entries(revoked: RevocationList) -> None:
+    previous, active, expired = os.urandom(32), os.urandom(32), os.urandom(32)
+    revoked.add(previous, time.time() + 60)
+    revoked.replace([(active, time.time() + 60), (expired, time.time() - 1)])
+    assert previous not in revoked
+    assert active in revoked
+    assert len(revoked) == 1
+
+
+def test_prune_drops_expired_entries(revoked: RevocationList, monkeypatch: pytest.MonkeyPatch) -> None:
+    short, long = os.urandom(32), os.urandom(32)
+    now = time.time()
+    revoked.add(short, now + 10)
+    revoked.add(long, now + 60)
+    monkeypatch.setattr(time, "time", lambda: now + 30)
+    revoked.prune()
+    assert short not in revoked
+    assert long in revoked
+
+
+def test_notification_payload_is_applied(revoked: RevocationList) -> None:
+    # Matches the payload crud.revoked_token.revoke_many sends
+    digests = [os.urandom(32) for _ in range(3)]
+    expires_ts = int(time.time()) + 60
+    listener = RevocationListener(revoked, dsn="postgresql://", reconnect_delay=1, prune_interval=1)
+    listener._on_notification(None, 0, "token_revoked", ",".join(f"{d.hex()}:{expires_ts}" for d in digests))
+    assert all(digest in revoked for digest in digests)
+    assert len(revoked) == 3
+
+
+def test_listener_dsn_drops_the_driver_name() -> None:
+    dsn = _listener_dsn("postgresql+asyncpg://user:p%40ss@db:5432/auth")
+    assert dsn == "postgresql://user:p%40ss@db:5432/auth"
+
+
+def test_listener_dsn_requires_a_database_uri() -> None:
+    with pytest.raises(ValueError):
+        _listener_dsn(None)
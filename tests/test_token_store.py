@@ -0,0 +1,193 @@
+import asyncio
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+import fakeredis
+import pytest
+
+from db.models.user import UserRole
+from token_store import kv, memory
+from token_store.base import TokenStore
+from token_store.kv import RedisTokenStore
+from token_store.memory import InMemoryTokenStore
+
+StoreFactory = Callable[[int, int], TokenStore]
+
+BANNED = "banned@example.com"
+# The stores only hand the session to get_session_owner, which the tests replace
+DB: Any = None
+
+
+def _memory_store(ttl_seconds: int, max_sessions: int) -> TokenStore:
+    return InMemoryTokenStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+
+
+def _redis_store(ttl_seconds: int, max_sessions: int) -> TokenStore:
+    return RedisTokenStore(
+        fakeredis.FakeAsyncRedis(), ttl_seconds=ttl_seconds, key_prefix="test:", max_sessions=max_sessions
+    )
+
+
+@pytest.fixture(params=[_memory_store, _redis_store], ids=["memory", "redis"])
+def make_store(request: Any, monkeypatch: pytest.MonkeyPatch) -> StoreFactory:
+    # Session owners come from Postgres; here every user but BANNED is an active admin
+    async def get_session_owner(db: Any, email: str) -> Optional[UserRole]:
+        return None if email == BANNED else UserRole.ADMIN
+
+    monkeypatch.setattr(memory, "get_session_owner", get_session_owner)
+    monkeypatch.setattr(kv, "get_session_owner", get_session_owner)
+    factory: StoreFactory = request.param
+    return factory
+
+
+def _run(make_store: StoreFactory, scenario: Callable[[TokenStore], Awaitable[None]], **kwargs: int) -> None:
+    async def main() -> None:
+        store = make_store(kwargs.get("ttl_seconds", 60), kwargs.get("max_sessions", 0))
+        try:
+            await scenario(store)
+        finally:
+            await store.close()
+
+    asyncio.run(main())
+
+
+async def _save(store: TokenStore, email: str = "user@example.com") -> tuple[bytes, bytes, list[bytes]]:
+    access_token_hash, refresh_token_hash = os.urandom(32), os.urandom(32)
+    evicted = await store.save(
+        DB,
+        session_id=uuid.uuid4(),
+        email=email,
+        access_token_hash=access_token_hash,
+        refresh_token_hash=refresh_token_hash,
+    )
+    return access_token_hash, refresh_token_hash, evicted
+
+
+async def _rotate(store: TokenStore, access_token_hash: bytes, refresh_token_hash: bytes) -> Any:
+    return await store.rotate(
+        DB,
+        access_token_hash=access_token_hash,
+        refresh_token_hash=refresh_token_hash,
+        new_access_token_hash=os.urandom(32),
+        new_refresh_token_hash=os.urandom(32),
+    )
+
+
+async def _active(store: TokenStore, *access_token_hashes: bytes) -> set[bytes]:
+    return await store.filter_active(DB, access_token_hashes=access_token_hashes)
+
+
+def test_saved_session_is_active(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, _, evicted = await _save(store)
+        assert evicted == []
+        assert await _active(store, access_token_hash, os.urandom(32)) == {access_token_hash}
+
+    _run(make_store, scenario)
+
+
+def test_rotate_swaps_the_tokens(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, refresh_token_hash, _ = await _save(store)
+        new_access_token_hash, new_refresh_token_hash = os.urandom(32), os.urandom(32)
+
+        rotated = await store.rotate(
+            DB,
+            access_token_hash=access_token_hash,
+            refresh_token_hash=refresh_token_hash,
+            new_access_token_hash=new_access_token_hash,
+            new_refresh_token_hash=new_refresh_token_hash,
+        )
+        assert rotated == ("user@example.com", UserRole.ADMIN)
+        assert await _active(store, access_token_hash, new_access_token_hash) == {new_access_token_hash}
+        assert await _rotate(store, new_access_token_hash, new_refresh_token_hash) is not None
+
+    _run(make_store, scenario)
+
+
+def test_rotate_with_stale_digests_fails(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, refresh_token_hash, _ = await _save(store)
+        assert await _rotate(store, access_token_hash, os.urandom(32)) is None
+        assert await _rotate(store, access_token_hash, refresh_token_hash) is not None
+        # The tokens of before the rotation are spent
+        assert await _rotate(store, access_token_hash, refresh_token_hash) is None
+
+    _run(make_store, scenario)
+
+
+def test_concurrent_rotations_swap_once(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, refresh_token_hash, _ = await _save(store)
+        results = await asyncio.gather(
+            *(_rotate(store, access_token_hash, refresh_token_hash) for _ in range(5))
+        )
+        assert sum(result is not None for result in results) == 1
+
+    _run(make_store, scenario)
+
+
+def test_rotate_fails_for_banned_owner(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, refresh_token_hash, _ = await _save(store, BANNED)
+        assert await _rotate(store, access_token_hash, refresh_token_hash) is None
+
+    _run(make_store, scenario)
+
+
+def test_revoke_needs_both_digests(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, refresh_token_hash, _ = await _save(store)
+        assert not await store.revoke(
+            DB, access_token_hash=access_token_hash, refresh_token_hash=os.urandom(32)
+        )
+        assert await store.revoke(
+            DB, access_token_hash=access_token_hash, refresh_token_hash=refresh_token_hash
+        )
+        assert await _active(store, access_token_hash) == set()
+        assert not await store.revoke(
+            DB, access_token_hash=access_token_hash, refresh_token_hash=refresh_token_hash
+        )
+
+    _run(make_store, scenario)
+
+
+def test_revoke_all_ends_only_the_users_sessions(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        first, _, _ = await _save(store)
+        second, _, _ = await _save(store)
+        other, _, _ = await _save(store, "other@example.com")
+
+        revoked = await store.revoke_all(DB, email="user@example.com")
+        assert set(revoked) == {first, second}
+        assert await _active(store, first, second, other) == {other}
+        assert await store.revoke_all(DB, email="user@example.com") == []
+
+    _run(make_store, scenario)
+
+
+def test_session_cap_ends_the_oldest_sessions(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        first, _, _ = await _save(store)
+        second, _, _ = await _save(store)
+        other, _, _ = await _save(store, "other@example.com")
+        third, _, evicted = await _save(store)
+
+        assert evicted == [first]
+        assert await _active(store, first, second, third, other) == {second, third, other}
+
+    _run(make_store, scenario, max_sessions=2)
+
+
+def test_expired_sessions_are_gone(make_store: StoreFactory) -> None:
+    async def scenario(store: TokenStore) -> None:
+        access_token_hash, refresh_token_hash, _ = await _save(store)
+        await asyncio.sleep(1.1)
+        assert await _active(store, access_token_hash) == set()
+        assert await _rotate(store, access_token_hash, refresh_token_hash) is None
+        # Expired sessions don't count against the cap either
+        _, _, evicted = await _save(store)
+        assert evicted == []
+
+    _run(make_store, scenario, ttl_seconds=1, max_sessions=1)
@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, AsyncIterator, Union
+
+import pytest
+
+from cli.import_users import parse_args
+from core.config import app_settings
+from core.user_import import UserImporter, read_records
+from db.models.user import UserRole
+from schemas.user import FileFormat, UserImportReport
+
+Record = tuple[int, Union[dict[str, Any], str]]
+
+
+def _read(data: bytes, file_format: FileFormat, chunk_size: int = 7) -> list[Record]:
+    # Small chunks split lines, and UTF-8 sequences, across reads
+    async def chunks() -> AsyncIterator[bytes]:
+        for start in range(0, len(data), chunk_size):
+            yield data[start:][:chunk_size]
+
+    async def collect() -> list[Record]:
+        return [record async for record in read_records(chunks(), file_format)]
+
+    return asyncio.run(collect())
+
+
+def test_csv_records() -> None:
+    data = (
+        "﻿email, full_name,role\r\n"
+        "a@example.com,Ä Person,A\r\n"
+        "\r\n"
+        'b@example.com,"Last, First",\n'
+        "c@example.com,Too,Many,Columns\n"
+        "d@example.com,No Newline"
+    ).encode()
+    assert _read(data, FileFormat.CSV) == [
+        (2, {"email": "a@example.com", "full_name": "Ä Person", "role": "A"}),
+        (4, {"email": "b@example.com", "full_name": "Last, First"}),
+        (5, "Expected 3 columns, got 4"),
+        (6, "Expected 3 columns, got 2"),
+    ]
+
+
+def test_jsonl_records() -> None:
+    data = b'{"email": "a@example.com", "full_name": "A"}\n\n{"email": \n[1, 2]\n\xff\n'
+    assert _read(data, FileFormat.JSONL) == [
+        (1, {"email": "a@example.com", "full_name": "A"}),
+        (3, "Not valid JSON"),
+        (4, "Not a JSON object"),
+        (5, "Not valid UTF-8"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "fields, creator_role, error",
+    [
+        ("Not valid JSON", None, "Not valid JSON"),
+        ({"email": "a@example.com"}, None, "full_name: field required"),
+        (
+            {"email": "not-an-email", "full_name": "A", "password": "p"},
+            None,
+            "email: value is not a valid email",
+        ),
+        ({"email": "a@example.com", "full_name": "A", "role": "SU", "password": "p"}, UserRole.ADMIN, "role"),
+    ],
+)
+def test_invalid_rows_are_reported(fields: Any, creator_role: Any, error: str) -> None:
+    report = UserImportReport()
+    assert UserImporter(batch_size=10, max_errors=10)._validate(report, 3, fields, creator_role) is None
+    assert report.failed == 1
+    assert report.errors[0].line == 3
+    assert error in report.errors[0].error
+
+
+def test_valid_row() -> None:
+    report = UserImportReport()
+    row = UserImporter(batch_size=10, max_errors=10)._validate(
+        report, 2, {"email": "a@example.com", "full_name": "A", "password": "p"}, UserRole.ADMIN
+    )
+    assert row is not None and row.role == UserRole.USER
+    assert report.failed == 0
+
+
+def test_errors_beyond_max_errors_are_only_counted() -> None:
+    report = UserImportReport()
+    importer = UserImporter(batch_size=10, max_errors=2)
+    for line in range(5):
+        importer._validate(report, line, "Not valid JSON", None)
+    assert report.failed == 5
+    assert [error.line for error in report.errors] == [0, 1]
+
+
+def test_cli_defaults_come_from_the_settings() -> None:
+    args = parse_args(["users.csv"])
+    assert args.batch_size == app_settings.USER_IMPORT_BATCH_SIZE
+    assert args.max_errors == app_settings.USER_IMPORT_MAX_ERRORS
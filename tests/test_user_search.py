@@ -0,0 +1,40 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from crud.crud_user import _escape_like
+
+
+@pytest.mark.parametrize(
+    "term, escaped",
+    [
+        ("alice", "alice"),
+        ("100%", "100/%"),
+        ("first_last", "first/_last"),
+        ("a/b", "a//b"),
+        ("/%_", "///%/_"),
+    ],
+)
+def test_escape_like(term: str, escaped: str) -> None:
+    assert _escape_like(term) == escaped
+
+
+@pytest.mark.parametrize(
+    "value, term, matches",
+    [
+        ("Save 100% now", "100%", True),
+        ("Save 1000 now", "100%", False),
+        ("first_last@example.com", "t_l", True),
+        ("firstxlast@example.com", "t_l", False),
+        ("a/b@example.com", "a/b", True),
+        ("ab@example.com", "a/b", False),
+    ],
+)
+def test_escaped_term_matches_literally(value: str, term: str, matches: bool) -> None:
+    # SQLite's LIKE handles ESCAPE the way Postgres' ILIKE does for these patterns
+    with closing(sqlite3.connect(":memory:")) as connection:
+        (result,) = connection.execute(
+            "SELECT ? LIKE ? ESCAPE '/'", (value, f"%{_escape_like(term)}%")
+        ).fetchone()
+    assert bool(result) is matches